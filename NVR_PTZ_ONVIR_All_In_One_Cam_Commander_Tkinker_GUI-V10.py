@@ -1,9 +1,9 @@
 #!/usr/bin/env python3
 # CamCommander PTZ & NVR GUI v9
 
-import tkinter as tk
-from tkinter import ttk, messagebox
-from onvif import ONVIFCamera
+import time
+_STARTUP_T0 = time.perf_counter()
+
 import json
 import os
 from pathlib import Path
@@ -11,75 +11,2259 @@ import sys
 import subprocess
 import re
 import webbrowser
-import glob
+import shutil
 import datetime
+import argparse
+import queue
+import random
+import signal
+import socket
+import socketserver
+import threading
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import urlparse, parse_qs
+
+# tkinter is only imported by the GUI (see _import_tk); headless mode never loads Tk.
+# onvif (zeep + lxml) is imported on first connect.
+tk = ttk = messagebox = None
+
+IPS_PATH = Path.home() / '.ptz_ips.json'
+CREDS_PATH = Path.home() / '.ptz_camera_creds.json'
+CONFIG_PATH = Path.home() / '.ptz_config.json'
+SAVE_DIR = "~/Videos/V380_Motion_Triggered_Vids"
+EXPORT_DIR = "~/Videos/CamCommander_Exports"
+DEFAULT_API_ADDR = "127.0.0.1:8766"
+DEFAULT_WSDL_PATH = '/home/x/onvif/wsdl/'
+RTSP_PORT = 554
+FLEET_CONCURRENCY = 200
+FLEET_TIMEOUT = 3.0
+FLEET_PROBES = ("onvif_tcp", "rtsp_tcp", "rtsp_options", "onvif_time")
+
+
+class StartupProfiler:
+    # Per-phase wall-clock timings for --profile-startup. A phase can be
+    # entered several times (lazy imports) and its durations add up.
+    PHASES = ("imports", "credential_load", "login_dialog", "wsdl_build",
+              "connect", "first_paint", "icons", "api_ready")
+
+    def __init__(self, t0):
+        self.t0 = t0
+        self.phases = {}
+        self.enabled = False
+        self.reported = False
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def as_dict(self):
+        result = {name: round(self.phases[name] * 1000, 1)
+                  for name in self.PHASES if name in self.phases}
+        result["total"] = round((time.perf_counter() - self.t0) * 1000, 1)
+        return result
+
+    def report(self):
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        timings = self.as_dict()
+        print("[PROFILE] Startup breakdown (ms):")
+        for name, ms in timings.items():
+            print(f"[PROFILE]   {name:<16} {ms:>9.1f}")
+        print(f"[PROFILE] JSON {json.dumps(timings)}", flush=True)
+
+
+STARTUP = StartupProfiler(_STARTUP_T0)
+
+
+class Metrics:
+    # Latency histograms, counters and gauges for the hot paths, rendered as
+    # Prometheus text (GET /metrics) or JSON (GET /metrics.json). Thread-safe.
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    HELP = {
+        "ccgui_onvif_call_seconds": ("histogram", "Latency of ONVIF SOAP calls"),
+        "ccgui_onvif_call_errors_total": ("counter", "Failed ONVIF SOAP calls"),
+        "ccgui_connect_seconds": ("histogram", "Full camera connection setup time"),
+        "ccgui_connect_errors_total": ("counter", "Failed camera connection attempts"),
+        "ccgui_camera_up": ("gauge", "1 while the ONVIF session is believed to be alive"),
+        "ccgui_disconnects_total": ("counter", "ONVIF sessions lost (failed call or keepalive probe)"),
+        "ccgui_reconnects_total": ("counter", "Successful background reconnects"),
+        "ccgui_ptz_outage_commands_total": ("counter", "PTZ commands issued while the camera was offline"),
+        "ccgui_disk_free_bytes": ("gauge", "Free space on the recordings filesystem"),
+        "ccgui_retention_deleted_total": ("counter", "Clips deleted by the retention engine"),
+        "ccgui_retention_deleted_bytes_total": ("counter", "Bytes freed by the retention engine"),
+        "ccgui_reencode_seconds": ("histogram", "Time to re-encode one aged clip"),
+        "ccgui_reencode_errors_total": ("counter", "Failed clip re-encodes"),
+        "ccgui_reencode_saved_bytes_total": ("counter", "Bytes saved by re-encoding aged clips"),
+        "ccgui_staging_bytes": ("gauge", "Bytes of recordings waiting in the staging directory"),
+        "ccgui_staging_flush_seconds": ("histogram", "Time to flush one batch of staged clips"),
+        "ccgui_staging_flush_errors_total": ("counter", "Failed staging flushes"),
+        "ccgui_staging_flushed_bytes_total": ("counter", "Bytes moved from staging to save_dir"),
+        "ccgui_staging_over_budget_total": ("counter", "Times staged data exceeded the memory budget"),
+        "ccgui_media_extract_seconds": ("histogram", "Time to probe and thumbnail one clip"),
+        "ccgui_media_extract_errors_total": ("counter", "Failed thumbnail/metadata extractions"),
+        "ccgui_motion_events_total": ("counter", "Events received from motion's hooks"),
+        "ccgui_export_seconds": ("histogram", "Time to export one time range"),
+        "ccgui_export_errors_total": ("counter", "Failed exports"),
+        "ccgui_motioneye_ready_seconds": ("histogram", "Time until motionEye answered HTTP after a request to open it"),
+        "ccgui_motioneye_ready_errors_total": ("counter", "motionEye open requests that never became ready"),
+        "ccgui_fleet_probe_seconds": ("histogram", "Fleet health probe latency (successful probes)"),
+        "ccgui_fleet_probe_errors_total": ("counter", "Fleet health probes that failed or timed out"),
+        "ccgui_recording_scan_seconds": ("histogram", "Time to scan the recordings directory"),
+        "ccgui_recording_scan_errors_total": ("counter", "Failed recordings directory scans"),
+        "ccgui_recording_files": ("gauge", "Clips in the recordings directory"),
+        "ccgui_recording_bytes": ("gauge", "Bytes in the recordings directory"),
+        "ccgui_child_starts_total": ("counter", "Child processes started"),
+        "ccgui_child_exits_total": ("counter", "Child processes that exited"),
+        "ccgui_child_up": ("gauge", "1 while the child process is running"),
+        "ccgui_child_rss_bytes": ("gauge", "Resident memory of a child process"),
+        "ccgui_child_cpu_seconds": ("gauge", "CPU time used by a running child process"),
+        "ccgui_process_rss_bytes": ("gauge", "Resident memory of this process"),
+        "ccgui_process_cpu_seconds": ("gauge", "CPU time used by this process"),
+        "ccgui_process_threads": ("gauge", "Threads in this process"),
+    }
 
-class PTZCameraControl:
     def __init__(self):
-        print("[DEBUG] Starting PTZCameraControl...")
-        self.save_dir = os.path.expanduser("~/Videos/V380_Motion_Triggered_Vids")
-        self.motion_conf_path = os.path.join(self.save_dir, "motion.conf")
-        action = {}
-        self.ip, self.username, self.password, action = self.get_ip_user_pass_with_action()
-        print(f"[DEBUG] Selected IP: {self.ip}")
-        print(f"[DEBUG] Selected Username: {self.username}")
-        self.config = self.load_config()
-        print(f"[DEBUG] Loaded config: {self.config}")
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def observe(self, name, seconds, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = {"buckets": [0] * len(self.BUCKETS), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    hist["buckets"][i] += 1
+                    break
+            hist["sum"] += seconds
+            hist["count"] += 1
+
+    @contextmanager
+    def timed(self, name, **labels):
+        # Observes the latency of the block; failures also bump <base>_errors_total.
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc(name[:-len("_seconds")] + "_errors_total", **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+        return "{" + body + "}"
+
+    def render_prometheus(self):
+        with self.lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            histograms = {k: {"buckets": list(v["buckets"]), "sum": v["sum"], "count": v["count"]}
+                          for k, v in self.histograms.items()}
+        lines = []
+        for kind, series in (("counter", counters), ("gauge", gauges), ("histogram", histograms)):
+            for name in sorted({key[0] for key in series}):
+                help_text = self.HELP.get(name, (kind, name))[1]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for (metric, labels), value in sorted(series.items()):
+                    if metric != name:
+                        continue
+                    if kind != "histogram":
+                        lines.append(f"{name}{self._labels(labels)} {value}")
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(self.BUCKETS, value["buckets"]):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{self._labels(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{name}_bucket{self._labels(labels, [('le', '+Inf')])} {value['count']}")
+                    lines.append(f"{name}_sum{self._labels(labels)} {value['sum']:.6f}")
+                    lines.append(f"{name}_count{self._labels(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                "counters": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(self.counters.items())],
+                "gauges": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(self.gauges.items())],
+                "histograms": [
+                    {"name": n, "labels": dict(l), "count": h["count"], "sum": round(h["sum"], 6),
+                     "avg": round(h["sum"] / h["count"], 6) if h["count"] else None,
+                     "buckets": dict(zip([str(b) for b in self.BUCKETS], h["buckets"]))}
+                    for (n, l), h in sorted(self.histograms.items())
+                ],
+            }
+
+
+METRICS = Metrics()
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def proc_stats(pid="self"):
+    # (rss_bytes, cpu_seconds, threads) from /proc; None on non-Linux or if pid is gone.
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        # fields[0] is the state (field 3 in proc(5)); utime/stime are 14/15, threads 20, rss 24.
+        cpu = (int(fields[11]) + int(fields[12])) / _CLK_TCK
+        return int(fields[21]) * _PAGE_SIZE, cpu, int(fields[17])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def is_network_error(exc):
+    # onvif-zeep re-raises everything as ONVIFError; the socket/requests error
+    # (an OSError) survives in the exception chain.
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        if isinstance(exc, OSError):
+            return True
+        seen.add(id(exc))
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def redact_config(config):
+    return {k: ("***" if k == "password" and v else v) for k, v in config.items()}
+
+
+def redact_url(url):
+    # Masks user:password@ and password query parameters (?pwd=, &password=, ...).
+    url = re.sub(r'(://[^:@/\s]*:)[^/\s]*@', r'\1***@', url)
+    return re.sub(r'(\b(?:pwd|pass|passwd|password)=)[^&\s]*', r'\1***', url, flags=re.IGNORECASE)
+
+
+STARTUP.add("imports", time.perf_counter() - _STARTUP_T0)
+
+
+def _import_tk():
+    global tk, ttk, messagebox
+    if tk is None:
+        with STARTUP.phase("imports"):
+            import tkinter
+            from tkinter import ttk as tk_ttk, messagebox as tk_messagebox
+        tk, ttk, messagebox = tkinter, tk_ttk, tk_messagebox
+
+
+def load_saved_logins():
+    previous_ips = []
+    if IPS_PATH.exists():
+        with open(IPS_PATH) as f:
+            previous_ips = json.load(f)
+        print(f"[DEBUG] Loaded previous IPs: {previous_ips}")
+
+    creds = {}
+    if CREDS_PATH.exists():
+        with open(CREDS_PATH) as f:
+            creds = json.load(f)
+        print(f"[DEBUG] Loaded previous creds for IPs: {list(creds.keys())}")
+    return previous_ips, creds
+
+
+def remember_ip(ip, previous_ips):
+    if ip not in previous_ips:
+        previous_ips.append(ip)
+        with open(IPS_PATH, 'w') as f:
+            json.dump(previous_ips, f)
+
+
+# --- Fleet health probes (asyncio; shared by GUI, daemon and --fleet) ---
+
+ONVIF_TIME_REQUEST = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<s:Envelope xmlns:s="http://www.w3.org/2003/05/soap-envelope"><s:Body>'
+    '<GetSystemDateAndTime xmlns="http://www.onvif.org/ver10/device/wsdl"/>'
+    '</s:Body></s:Envelope>'
+)
+
+
+async def _probe_tcp(ip, port):
+    import asyncio
+    reader, writer = await asyncio.open_connection(ip, port)
+    writer.close()
+    return {}
+
+
+async def _probe_rtsp_options(ip, port):
+    import asyncio
+    reader, writer = await asyncio.open_connection(ip, port)
+    try:
+        writer.write(
+            f"OPTIONS rtsp://{ip}:{port}/Streaming/Channels/101 RTSP/1.0\r\n"
+            "CSeq: 1\r\nUser-Agent: CamCommander\r\n\r\n".encode()
+        )
+        await writer.drain()
+        line = await reader.readline()
+    finally:
+        writer.close()
+    parts = line.decode(errors="replace").split()
+    if len(parts) < 2 or not parts[0].startswith("RTSP/"):
+        raise Exception(f"not an RTSP reply: {line[:40]!r}")
+    # 401 still proves the RTSP server is alive.
+    return {"status": int(parts[1])}
 
-        self.root = tk.Tk()
-        self.root.title("CamCommander - PTZ Ctrl + NVR Recording GUI")
-        self.root.geometry("380x640")
 
-        self.status_label = tk.Label(
-            self.root, text="Disconnected", fg="red",
-            font=("Helvetica", 22, "bold")
+async def _probe_onvif_time(ip, port):
+    # GetSystemDateAndTime needs no auth per the ONVIF spec, so plain HTTP is enough.
+    import asyncio
+    body = ONVIF_TIME_REQUEST.encode()
+    reader, writer = await asyncio.open_connection(ip, port)
+    try:
+        sent = time.time()
+        writer.write(
+            f"POST /onvif/device_service HTTP/1.1\r\nHost: {ip}:{port}\r\n"
+            "Content-Type: application/soap+xml; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
         )
-        self.status_label.pack(pady=10)
+        await writer.drain()
+        # Connection: close, so read to EOF; the caller's wait_for bounds it.
+        data = (await reader.read()).decode(errors="replace")
+        received = time.time()
+    finally:
+        writer.close()
+    section = data.partition("UTCDateTime")[2]
+    fields = {}
+    for name in ("Year", "Month", "Day", "Hour", "Minute", "Second"):
+        match = re.search(rf"<(?:[\w-]+:)?{name}>(\d+)<", section)
+        if not match:
+            raise Exception("no UTCDateTime in reply")
+        fields[name] = int(match.group(1))
+    cam_time = datetime.datetime(
+        fields["Year"], fields["Month"], fields["Day"],
+        fields["Hour"], fields["Minute"], fields["Second"],
+        tzinfo=datetime.timezone.utc
+    ).timestamp()
+    return {"skew_s": round(cam_time - (sent + received) / 2, 1) or 0.0}
+
+
+async def probe_fleet(cameras, onvif_port, on_result, concurrency=FLEET_CONCURRENCY, timeout=FLEET_TIMEOUT):
+    # All probes of all cameras run at once, capped by a semaphore, so the
+    # sweep takes about as long as the slowest probe rather than the sum.
+    import asyncio
+    sem = asyncio.Semaphore(concurrency)
+    probes = {
+        "onvif_tcp": (_probe_tcp, onvif_port),
+        "rtsp_tcp": (_probe_tcp, RTSP_PORT),
+        "rtsp_options": (_probe_rtsp_options, RTSP_PORT),
+        "onvif_time": (_probe_onvif_time, onvif_port),
+    }
+
+    async def run(ip, name):
+        fn, port = probes[name]
+        async with sem:
+            start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(fn(ip, port), timeout)
+                elapsed = time.perf_counter() - start
+                result.update(ok=True, ms=round(elapsed * 1000, 1))
+                METRICS.observe("ccgui_fleet_probe_seconds", elapsed, camera=ip, probe=name)
+            except asyncio.TimeoutError:
+                result = {"ok": False, "error": "timeout"}
+            except Exception as e:
+                result = {"ok": False, "error": str(e) or type(e).__name__}
+        if not result["ok"]:
+            METRICS.inc("ccgui_fleet_probe_errors_total", camera=ip, probe=name)
+        on_result(ip, name, result)
+
+    await asyncio.gather(*(run(ip, name) for ip in cameras for name in FLEET_PROBES))
+
+
+def run_fleet_probe(cameras, config, on_result=None):
+    # Blocking; call it from a worker thread. Returns {ip: {probe: result}}.
+    import asyncio
+    results = {ip: {} for ip in cameras}
+
+    def collect(ip, name, result):
+        results[ip][name] = result
+        if on_result:
+            on_result(ip, name, result)
+
+    asyncio.run(probe_fleet(
+        cameras, config.get('port', 8899), collect,
+        config.get('fleet_concurrency', FLEET_CONCURRENCY),
+        config.get('fleet_timeout', FLEET_TIMEOUT)
+    ))
+    return results
+
+
+def fleet_health(probes):
+    # Overall verdict for one camera from the probe results seen so far.
+    if not probes:
+        return "…"
+    ok = [p.get("ok") for p in probes.values()]
+    if all(ok):
+        return "UP" if len(probes) == len(FLEET_PROBES) else "…"
+    return "DOWN" if not any(ok) else "DEGRADED"
+
+
+# --- Recordings index + retention ---
+
+VIDEO_EXTS = (".mp4", ".mkv", ".avi")
+SIZE_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def parse_size(value):
+    # 5368709120, "5G", "500M" -> bytes
+    if value is None or isinstance(value, (int, float)):
+        return value
+    value = str(value).strip().upper().rstrip("B")
+    if value and value[-1] in SIZE_UNITS:
+        return int(float(value[:-1]) * SIZE_UNITS[value[-1]])
+    return int(float(value))
+
+
+class ClipIndex:
+    # sqlite index of the clips in save_dir. Kept current from directory
+    # mtimes, so a refresh only lists a folder after something was added to
+    # or removed from it, and only new files are stat()ed. Supported layouts:
+    # clips at the top level belong to camera "" (shown as "default"); a clip
+    # in a sub-folder belongs to the camera named by its first folder, however
+    # deep it is (cam/clip.mp4, cam/20260131/clip.mp4). With a date-only
+    # movie_filename (%Y%m%d/%H%M%S) each day folder shows up as a "camera".
+    DB_NAME = ".ccgui-index.sqlite"
+    # Clips modified this recently may still be growing; re-stat them on sync.
+    ACTIVE_WINDOW = 900
+    # add()/remove() record the folder's new mtime themselves, so the hooks,
+    # the staging flusher and retention don't force a re-listing. A full
+    # reconcile (every folder listed) runs on the first sync and this often,
+    # catching anything else that changed in such a folder meanwhile.
+    FULL_SYNC_INTERVAL = 3600
+
+    def __init__(self, root):
+        import sqlite3
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        self.last_full_sync = None
+        self.db = sqlite3.connect(os.path.join(root, self.DB_NAME), check_same_thread=False)
+        self.db.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS clips (
+                path TEXT PRIMARY KEY,
+                camera TEXT NOT NULL,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL,
+                reencoded INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS clips_mtime ON clips(mtime);
+            CREATE INDEX IF NOT EXISTS clips_camera_mtime ON clips(camera, mtime, size);
+            DROP TABLE IF EXISTS dirs;
+            CREATE TABLE IF NOT EXISTS folders (path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS media (
+                path TEXT PRIMARY KEY,
+                mtime REAL NOT NULL,
+                duration REAL,
+                codec TEXT,
+                width INTEGER,
+                height INTEGER
+            );
+        """)
+
+    def full_path(self, rel):
+        return os.path.join(self.root, rel)
+
+    def camera_for(self, path):
+        rel = os.path.relpath(path, self.root)
+        parts = rel.split(os.sep)
+        return rel, (parts[0] if len(parts) >= 2 else "")
+
+    def contains(self, path):
+        # Only files under root may be indexed; retention deletes via full_path().
+        root = os.path.abspath(self.root)
+        return os.path.commonpath([os.path.abspath(path), root]) == root
+
+    def add(self, path):
+        # Called directly by the motion hooks / staging flusher, no listing needed.
+        if not self.contains(path):
+            print(f"[DEBUG] Not indexing {path}: outside {self.root}")
+            return
+        rel, camera = self.camera_for(path)
+        st = os.stat(path)
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT INTO clips (path, camera, mtime, size) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET mtime=excluded.mtime, size=excluded.size",
+                (rel, camera, st.st_mtime, st.st_size)
+            )
+        self._note_folder(os.path.dirname(rel))
+
+    def remove(self, rel):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM clips WHERE path=?", (rel,))
+            self.db.execute("DELETE FROM media WHERE path=?", (rel,))
+        self._note_folder(os.path.dirname(rel))
+
+    def _note_folder(self, folder):
+        # The index already has our change; only a folder sync knows about is updated.
+        try:
+            mtime_ns = os.stat(self.full_path(folder) if folder else self.root).st_mtime_ns
+        except FileNotFoundError:
+            return
+        with self.lock, self.db:
+            self.db.execute("UPDATE folders SET mtime_ns=? WHERE path=?", (mtime_ns, folder))
+
+    def _folder_clips(self, folder):
+        # Indexed paths directly in folder (not in its sub-folders).
+        with self.lock:
+            if not folder:
+                return {row[0] for row in self.db.execute("SELECT path FROM clips WHERE camera=''")}
+            prefix = folder + os.sep
+            rows = self.db.execute(
+                "SELECT path FROM clips WHERE path >= ? AND path < ?", (prefix, folder + chr(ord(os.sep) + 1))
+            )
+            return {row[0] for row in rows if os.sep not in row[0][len(prefix):]}
+
+    def _forget_folder(self, folder):
+        # The folder is gone: drop its clips and sub-folders.
+        bounds = (folder + os.sep, folder + chr(ord(os.sep) + 1))
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM clips WHERE path >= ? AND path < ?", bounds)
+            self.db.execute("DELETE FROM folders WHERE path=? OR (path >= ? AND path < ?)", (folder,) + bounds)
+
+    def _reconcile(self, folder, path):
+        # Lists one folder, applies added/removed clips; -> its sub-folders.
+        prefix = folder + os.sep if folder else ""
+        names, subdirs = set(), []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.name.startswith("."):
+                        continue
+                    if entry.is_dir():
+                        subdirs.append(prefix + entry.name)
+                    elif entry.name.lower().endswith(VIDEO_EXTS) and entry.is_file():
+                        names.add(prefix + entry.name)
+        except FileNotFoundError:
+            pass
+        indexed = self._folder_clips(folder)
+        camera = folder.split(os.sep)[0]
+        added = []
+        for rel in names - indexed:
+            try:
+                st = os.stat(self.full_path(rel))
+            except FileNotFoundError:
+                continue
+            added.append((rel, camera, st.st_mtime, st.st_size))
+        with self.lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO clips (path, camera, mtime, size) VALUES (?, ?, ?, ?)", added)
+            self.db.executemany("DELETE FROM clips WHERE path=?", [(rel,) for rel in indexed - names])
+        return subdirs
+
+    def sync(self, full=None):
+        with self.sync_lock:
+            if full is None:
+                full = (self.last_full_sync is None
+                        or time.monotonic() - self.last_full_sync >= self.FULL_SYNC_INTERVAL)
+            self._sync(full)
+            if full:
+                self.last_full_sync = time.monotonic()
+
+    def _sync(self, full):
+        with self.lock:
+            known = dict(self.db.execute("SELECT path, mtime_ns FROM folders"))
+        children = {}
+        for folder in known:
+            if folder:
+                children.setdefault(os.path.dirname(folder), []).append(folder)
+        changed, seen = {}, set()
+        pending = [""]
+        while pending:
+            folder = pending.pop()
+            seen.add(folder)
+            path = self.full_path(folder) if folder else self.root
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                seen.discard(folder)
+                continue
+            if full or known.get(folder) != mtime_ns:
+                subdirs = self._reconcile(folder, path)
+                changed[folder] = mtime_ns
+            else:
+                subdirs = children.get(folder, [])
+            pending.extend(d for d in subdirs if d not in seen)
+        for folder in set(known) - seen:
+            if folder:
+                self._forget_folder(folder)
+        self._restat_active()
+        if changed:
+            with self.lock, self.db:
+                self.db.executemany("INSERT OR REPLACE INTO folders VALUES (?, ?)", changed.items())
+
+    def _restat_active(self):
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT path, mtime, size FROM clips WHERE mtime > ?", (time.time() - self.ACTIVE_WINDOW,)
+            ).fetchall()
+        updates = []
+        for rel, mtime, size in rows:
+            try:
+                st = os.stat(self.full_path(rel))
+            except FileNotFoundError:
+                continue
+            if st.st_mtime != mtime or st.st_size != size:
+                updates.append((st.st_mtime, st.st_size, rel))
+        if updates:
+            with self.lock, self.db:
+                self.db.executemany("UPDATE clips SET mtime=?, size=? WHERE path=?", updates)
+
+    def totals(self):
+        # {camera: (count, bytes, oldest_mtime, newest_mtime)}
+        with self.lock:
+            return {row[0]: row[1:] for row in self.db.execute(
+                "SELECT camera, COUNT(*), COALESCE(SUM(size), 0), MIN(mtime), MAX(mtime) FROM clips GROUP BY camera")}
+
+    def oldest(self, camera=None, limit=100, before=None, after=None):
+        # after=(mtime, path) of the last row already seen: a keyset cursor, so
+        # rows the caller skipped are not handed back again.
+        query = "SELECT path, camera, size, mtime, reencoded FROM clips"
+        clauses, params = [], []
+        if camera is not None:
+            clauses.append("camera=?")
+            params.append(camera)
+        if before is not None:
+            clauses.append("mtime < ?")
+            params.append(before)
+        if after is not None:
+            clauses.append("(mtime > ? OR (mtime = ? AND path > ?))")
+            params.extend([after[0], after[0], after[1]])
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY mtime, path LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            return self.db.execute(query, params).fetchall()
+
+    def listing(self, camera=None):
+        # [(rel, camera, mtime, size)] newest first, for the recordings browser.
+        query = "SELECT path, camera, mtime, size FROM clips"
+        params = ()
+        if camera is not None:
+            query += " WHERE camera=?"
+            params = (camera,)
+        with self.lock:
+            return self.db.execute(query + " ORDER BY mtime DESC", params).fetchall()
+
+    def between(self, camera, start, end):
+        # [(rel, mtime)] of clips that finished in [start, end), oldest first.
+        with self.lock:
+            return self.db.execute(
+                "SELECT path, mtime FROM clips WHERE camera=? AND mtime >= ? AND mtime < ? ORDER BY mtime",
+                (camera, start, end)
+            ).fetchall()
+
+    def duration(self, rel, mtime):
+        # Clip length from the media cache, probing (and caching) it if needed.
+        with self.lock:
+            row = self.db.execute("SELECT mtime, duration FROM media WHERE path=?", (rel,)).fetchone()
+        if row is not None and row[0] == mtime and row[1]:
+            return row[1]
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", self.full_path(rel)],
+            capture_output=True, text=True, timeout=30
+        )
+        try:
+            duration = float(result.stdout.strip())
+        except ValueError:
+            return None
+        # Keep codec/size from MediaCatalog if the row is still current; a
+        # duration-only row (codec NULL) is still extracted by the browser.
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT INTO media (path, mtime, duration) VALUES (?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET duration=excluded.duration, "
+                "codec=CASE WHEN mtime=excluded.mtime THEN codec END, "
+                "width=CASE WHEN mtime=excluded.mtime THEN width END, "
+                "height=CASE WHEN mtime=excluded.mtime THEN height END, "
+                "mtime=excluded.mtime",
+                (rel, mtime, duration)
+            )
+        return duration
+
+    def paths(self, camera=None):
+        with self.lock:
+            if camera is None:
+                rows = self.db.execute("SELECT path FROM clips ORDER BY mtime")
+            else:
+                rows = self.db.execute("SELECT path FROM clips WHERE camera=? ORDER BY mtime", (camera,))
+            return [self.full_path(r[0]) for r in rows]
+
+    def mark_reencoded(self, rel, size):
+        with self.lock, self.db:
+            self.db.execute("UPDATE clips SET reencoded=1, size=? WHERE path=?", (size, rel))
+            self.db.execute("DELETE FROM media WHERE path=?", (rel,))
+        self._note_folder(os.path.dirname(rel))
+
+
+class RetentionManager:
+    # Background quota enforcement over a ClipIndex, configured by the
+    # "retention" block of ~/.ptz_config.json:
+    #   max_bytes / max_age_days      global limits
+    #   min_free_bytes                keep this much free on the filesystem
+    #   cameras: {name: {max_bytes, max_age_days}}   per-camera limits
+    #   reencode_after_days / reencode_crf / reencode_workers
+    # Deletes oldest-first straight from the index; nothing is deleted unless
+    # a limit is configured.
+    INTERVAL = 60
+    # Never touch a clip that was written to this recently (motion may still own it).
+    MIN_AGE = 120
+
+    def __init__(self, index, settings, on_change=None):
+        self.index = index
+        self.settings = settings
+        self.on_change = on_change
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.pool = None
+        self.reencoding = set()
+        workers = int(settings.get('reencode_workers', 1))
+        if settings.get('reencode_after_days') and workers > 0:
+            from concurrent.futures import ThreadPoolExecutor
+            # Each worker just waits on one ffmpeg process, so this bounds the encoders.
+            self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reencode")
+            self.max_pending = workers * 2
+
+    def start(self):
+        self.thread = threading.Thread(target=self.loop, name="retention", daemon=True)
+        self.thread.start()
 
+    def stop(self):
+        self.stop_event.set()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
+
+    def loop(self):
+        while not self.stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"[DEBUG] Retention pass failed: {e}")
+            self.stop_event.wait(self.settings.get('interval', self.INTERVAL))
+
+    def run_once(self):
+        with METRICS.timed("ccgui_recording_scan_seconds"):
+            self.index.sync()
+        deleted = self.enforce()
+        if self.pool is not None:
+            self.schedule_reencodes()
+        if deleted and self.on_change:
+            self.on_change()
+        return deleted
+
+    def delete(self, rows, reason):
+        # -> (bytes freed, clips deleted); clips being re-encoded or that
+        # can't be removed are skipped and stay in the index.
+        freed = deleted = 0
+        for rel, camera, size, mtime, _ in rows:
+            if rel in self.reencoding:
+                continue
+            try:
+                os.remove(self.index.full_path(rel))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"[DEBUG] Retention could not delete {rel}: {e}")
+                continue
+            self.index.remove(rel)
+            freed += size
+            deleted += 1
+            METRICS.inc("ccgui_retention_deleted_total", camera=camera or "default", reason=reason)
+            METRICS.inc("ccgui_retention_deleted_bytes_total", size, camera=camera or "default")
+            print(f"[DEBUG] Retention ({reason}) deleted {rel} ({size / 2**20:.1f} MB)")
+        return freed, deleted
+
+    def trim(self, need_bytes, camera, reason):
+        # Delete oldest-first until need_bytes are freed; skipped clips don't
+        # count and the cursor moves past them, so this always terminates.
+        freed = deleted = 0
+        cutoff = time.time() - self.MIN_AGE
+        cursor = None
+        while freed < need_bytes:
+            rows = self.index.oldest(camera, limit=50, before=cutoff, after=cursor)
+            batch, planned = [], freed
+            for row in rows:
+                if planned >= need_bytes:
+                    break
+                batch.append(row)
+                planned += row[2]
+            if not batch:
+                break
+            cursor = (batch[-1][3], batch[-1][0])
+            batch_freed, batch_deleted = self.delete(batch, reason)
+            freed += batch_freed
+            deleted += batch_deleted
+        return deleted
+
+    def expire(self, max_age_days, camera, reason):
+        cutoff = time.time() - max_age_days * 86400
+        deleted = 0
+        cursor = None
+        while True:
+            rows = self.index.oldest(camera, limit=200, before=cutoff, after=cursor)
+            if not rows:
+                return deleted
+            cursor = (rows[-1][3], rows[-1][0])
+            deleted += self.delete(rows, reason)[1]
+
+    def enforce(self):
+        settings = self.settings
+        deleted = 0
+        for camera, limits in (settings.get('cameras') or {}).items():
+            key = "" if camera == "default" else camera
+            if limits.get('max_age_days'):
+                deleted += self.expire(limits['max_age_days'], key, "camera_age")
+            max_bytes = parse_size(limits.get('max_bytes'))
+            if max_bytes:
+                used = self.index.totals().get(key, (0, 0))[1]
+                if used > max_bytes:
+                    deleted += self.trim(used - max_bytes, key, "camera_quota")
+        if settings.get('max_age_days'):
+            deleted += self.expire(settings['max_age_days'], None, "age")
+        max_bytes = parse_size(settings.get('max_bytes'))
+        if max_bytes:
+            used = sum(t[1] for t in self.index.totals().values())
+            if used > max_bytes:
+                deleted += self.trim(used - max_bytes, None, "quota")
+        free = shutil.disk_usage(self.index.root).free
+        min_free = parse_size(settings.get('min_free_bytes'))
+        if min_free and free < min_free:
+            deleted += self.trim(min_free - free, None, "min_free")
+            free = shutil.disk_usage(self.index.root).free
+        METRICS.set_gauge("ccgui_disk_free_bytes", free)
+        return deleted
+
+    def schedule_reencodes(self):
+        cutoff = time.time() - float(self.settings['reencode_after_days']) * 86400
+        slots = self.max_pending - len(self.reencoding)
+        if slots <= 0:
+            return
+        with self.index.lock:
+            rows = self.index.db.execute(
+                "SELECT path, mtime FROM clips WHERE reencoded=0 AND mtime < ? ORDER BY mtime LIMIT ?",
+                (cutoff, slots + len(self.reencoding))
+            ).fetchall()
+        for rel, mtime in rows:
+            if rel in self.reencoding or slots <= 0:
+                continue
+            self.reencoding.add(rel)
+            slots -= 1
+            self.pool.submit(self.reencode, rel, mtime)
+
+    def reencode(self, rel, mtime):
+        src = self.index.full_path(rel)
+        head, name = os.path.split(src)
+        tmp = os.path.join(head, f".{name}.reencode{os.path.splitext(name)[1]}")
+        cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", src,
+               "-c:v", "libx264", "-preset", "veryfast", "-crf", str(self.settings.get('reencode_crf', 30)),
+               "-c:a", "copy", tmp]
+        if shutil.which("nice"):
+            cmd = ["nice", "-n", "19"] + cmd
+        try:
+            with METRICS.timed("ccgui_reencode_seconds"):
+                result = subprocess.run(cmd, capture_output=True, text=True)
+                if result.returncode != 0:
+                    raise Exception(result.stderr.strip()[-200:])
+            old_size = os.path.getsize(src)
+            new_size = os.path.getsize(tmp)
+            if new_size < old_size:
+                os.utime(tmp, (time.time(), mtime))  # keep the clip's place in the timeline
+                os.replace(tmp, src)
+                METRICS.inc("ccgui_reencode_saved_bytes_total", old_size - new_size)
+                print(f"[DEBUG] Re-encoded {rel}: {old_size / 2**20:.1f} -> {new_size / 2**20:.1f} MB")
+            else:
+                os.remove(tmp)
+                new_size = old_size
+            self.index.mark_reencoded(rel, new_size)
+        except Exception as e:
+            print(f"[DEBUG] Re-encode of {rel} failed: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            # Don't retry a clip ffmpeg can't read.
+            self.index.mark_reencoded(rel, os.path.getsize(src) if os.path.exists(src) else 0)
+        finally:
+            self.reencoding.discard(rel)
+
+
+class MotionEyeService:
+    # motionEye's systemd unit, checked by asking its web UI rather than
+    # sleeping after "systemctl start". ensure_running() blocks, so callers
+    # run it on a worker; a recent "up" is cached so repeat clicks cost nothing.
+    UNIT = "motioneye.service"
+    CACHE_TTL = 10.0
+    START_TIMEOUT = 20.0
+    POLL = 0.25
+
+    def __init__(self, url):
+        self.url = url
+        self.lock = threading.Lock()
+        self.state = "unknown"
+        self.checked_at = 0.0
+
+    def http_up(self):
+        # Any HTTP answer (even 401/404) means the server is accepting requests.
+        import urllib.request
+        import urllib.error
+        try:
+            urllib.request.urlopen(self.url, timeout=1).close()
+            return True
+        except urllib.error.HTTPError:
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def set_state(self, state):
+        self.state = state
+        self.checked_at = time.monotonic()
+
+    def ensure_running(self):
+        # Raises if motionEye cannot be brought up. Only one caller probes/starts at a time.
+        with self.lock:
+            if self.state == "up" and time.monotonic() - self.checked_at < self.CACHE_TTL:
+                return
+            with METRICS.timed("ccgui_motioneye_ready_seconds"):
+                if self.http_up():
+                    self.set_state("up")
+                    return
+                active = subprocess.run(["systemctl", "is-active", self.UNIT], capture_output=True, text=True)
+                if active.stdout.strip() != "active":
+                    print(f"[DEBUG] {self.UNIT} is {active.stdout.strip() or 'unknown'}, starting it...")
+                    started = subprocess.run(["systemctl", "start", self.UNIT], capture_output=True, text=True)
+                    if started.returncode != 0:
+                        self.set_state("down")
+                        raise Exception(started.stderr.strip() or f"systemctl start exited with {started.returncode}")
+                self.set_state("starting")
+                deadline = time.monotonic() + self.START_TIMEOUT
+                while time.monotonic() < deadline:
+                    if self.http_up():
+                        self.set_state("up")
+                        return
+                    time.sleep(self.POLL)
+                self.set_state("down")
+                raise Exception(f"{self.url} did not answer within {self.START_TIMEOUT:.0f}s")
+
+
+class ExportJob:
+    # Lossless export of one camera's footage between two times: the clips
+    # that overlap the range are joined with ffmpeg's concat demuxer and
+    # trimmed with inpoint/outpoint, all with -c copy, so the cost is I/O
+    # rather than transcoding (cuts land on the nearest keyframe). Runs on
+    # its own thread; on_update(job) is called as progress (0..1) moves.
+    # Clips are stamped with their end time, so look this far past the range end.
+    MAX_CLIP_SECONDS = 3600
+
+    def __init__(self, index, camera, start, end, out_path, on_update=None):
+        self.index = index
+        self.camera = camera
+        self.start_ts = start
+        self.end_ts = end
+        self.out_path = out_path
+        self.on_update = on_update or (lambda job: None)
+        self.state = "queued"
+        self.progress = 0.0
+        self.error = None
+        self.clips = 0
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="export", daemon=True)
+        self.thread.start()
+        return self
+
+    def plan(self):
+        # [(path, inpoint, outpoint, duration)]; None means "from the start" / "to the end".
+        parts = []
+        for rel, mtime in self.index.between(self.camera, self.start_ts, self.end_ts + self.MAX_CLIP_SECONDS):
+            duration = self.index.duration(rel, mtime) or 0.0
+            clip_start = mtime - duration
+            if clip_start >= self.end_ts:
+                continue
+            inpoint = self.start_ts - clip_start if clip_start < self.start_ts else None
+            outpoint = self.end_ts - clip_start if mtime > self.end_ts else None
+            parts.append((self.index.full_path(rel), inpoint, outpoint, duration))
+        return parts
+
+    def run(self):
+        self.state = "running"
+        self.on_update(self)
+        list_path = self.out_path + ".concat.txt"
+        try:
+            with METRICS.timed("ccgui_export_seconds"):
+                parts = self.plan()
+                if not parts:
+                    raise Exception("no recordings in that time range")
+                self.clips = len(parts)
+                total = sum((out if out is not None else dur) - (inp or 0.0) for _, inp, out, dur in parts)
+                os.makedirs(os.path.dirname(self.out_path) or ".", exist_ok=True)
+                with open(list_path, "w") as f:
+                    f.write("ffconcat version 1.0\n")
+                    for path, inpoint, outpoint, _ in parts:
+                        f.write("file '" + path.replace("'", "'\\''") + "'\n")
+                        if inpoint is not None:
+                            f.write(f"inpoint {inpoint:.3f}\n")
+                        if outpoint is not None:
+                            f.write(f"outpoint {outpoint:.3f}\n")
+                proc = subprocess.Popen(
+                    ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostats", "-y",
+                     "-f", "concat", "-safe", "0", "-i", list_path,
+                     "-map", "0", "-c", "copy", "-avoid_negative_ts", "make_zero",
+                     "-progress", "pipe:1", self.out_path],
+                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+                )
+                for line in proc.stdout:
+                    if line.startswith("out_time_us=") and total > 0:
+                        try:
+                            done = int(line.split("=", 1)[1]) / 1e6
+                        except ValueError:
+                            continue
+                        self.progress = max(0.0, min(1.0, done / total))
+                        self.on_update(self)
+                if proc.wait() != 0:
+                    raise Exception(proc.stderr.read().strip()[-300:] or f"ffmpeg exited with {proc.returncode}")
+            self.state = "done"
+            self.progress = 1.0
+            print(f"[DEBUG] Exported {self.clips} clip(s) to {self.out_path}")
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            print(f"[DEBUG] Export failed: {e}")
+        finally:
+            if os.path.exists(list_path):
+                os.remove(list_path)
+        self.on_update(self)
+
+
+def export_path(camera, start, end):
+    fmt = "%Y%m%d-%H%M%S"
+    name = f"{camera or 'default'}_{datetime.datetime.fromtimestamp(start):{fmt}}_{datetime.datetime.fromtimestamp(end):{fmt}}.mkv"
+    return os.path.join(os.path.expanduser(EXPORT_DIR), name)
+
+
+def set_motion_option(text, key, value):
+    # Set (or uncomment / append) one "key value" line in a motion.conf.
+    line = f"{key} {value}"
+    pattern = re.compile(rf'^[ \t]*[;#]?[ \t]*{re.escape(key)}\b.*$', re.MULTILINE)
+    if pattern.search(text):
+        return pattern.sub(lambda m: line, text, count=1)
+    return text.rstrip("\n") + "\n" + line + "\n"
+
+
+class MediaCatalog:
+    # Thumbnails + ffprobe metadata for the recordings browser. Extraction
+    # runs in a bounded pool (each worker drives one ffprobe/ffmpeg at a
+    # time); metadata is cached in the clip index and thumbnails as PNGs
+    # under ~/.cache/ccgui/thumbs, both keyed by path + mtime so a changed
+    # clip is extracted again.
+    THUMB_WIDTH = 160
+    CACHE_DIR = os.path.expanduser("~/.cache/ccgui/thumbs")
+
+    def __init__(self, index, workers=None):
+        from concurrent.futures import ThreadPoolExecutor
+        self.index = index
+        os.makedirs(self.CACHE_DIR, exist_ok=True)
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="media")
+        self.pending = {}
+        self.pending_lock = threading.Lock()
+        self.have_ffmpeg = shutil.which("ffprobe") is not None and shutil.which("ffmpeg") is not None
+
+    def thumb_path(self, rel, mtime):
+        import hashlib
+        key = hashlib.sha1(f"{rel}:{mtime}".encode()).hexdigest()
+        return os.path.join(self.CACHE_DIR, key + ".png")
+
+    def cached(self, rel, mtime):
+        # -> (duration, codec, width, height) or None; cheap enough for the UI thread.
+        with self.index.lock:
+            row = self.index.db.execute(
+                "SELECT mtime, duration, codec, width, height FROM media WHERE path=?", (rel,)
+            ).fetchone()
+        if row is None or row[0] != mtime or row[2] is None:
+            return None
+        return row[1:]
+
+    def request(self, rel, mtime, callback):
+        # Queue extraction unless it's cached or already queued; callback(rel) runs on a worker.
+        if not self.have_ffmpeg:
+            return
+        with self.pending_lock:
+            if rel in self.pending:
+                return
+            self.pending[rel] = self.pool.submit(self.extract, rel, mtime, callback)
+
+    def cancel_except(self, keep):
+        # Drop queued work for rows that scrolled out of view.
+        with self.pending_lock:
+            for rel in [r for r in self.pending if r not in keep]:
+                if self.pending[rel].cancel():
+                    del self.pending[rel]
+
+    def extract(self, rel, mtime, callback):
+        path = self.index.full_path(rel)
+        duration = codec = width = height = None
+        try:
+            with METRICS.timed("ccgui_media_extract_seconds"):
+                probe = subprocess.run(
+                    ["ffprobe", "-v", "error", "-select_streams", "v:0",
+                     "-show_entries", "format=duration:stream=codec_name,width,height", "-of", "json", path],
+                    capture_output=True, text=True, timeout=30
+                )
+                info = json.loads(probe.stdout or "{}")
+                stream = (info.get("streams") or [{}])[0]
+                codec, width, height = stream.get("codec_name"), stream.get("width"), stream.get("height")
+                duration = float(info.get("format", {}).get("duration") or 0) or None
+                seek = min(1.0, duration / 2) if duration else 0
+                subprocess.run(
+                    ["ffmpeg", "-v", "error", "-y", "-ss", str(seek), "-i", path, "-frames:v", "1",
+                     "-vf", f"scale={self.THUMB_WIDTH}:-2", self.thumb_path(rel, mtime)],
+                    capture_output=True, timeout=30
+                )
+        except Exception as e:
+            print(f"[DEBUG] Media extraction failed for {rel}: {e}")
+        # Failures are cached too (codec ""), so a broken clip isn't retried on every scroll;
+        # codec NULL means only ClipIndex.duration() has seen the clip.
+        with self.index.lock, self.index.db:
+            self.index.db.execute(
+                "INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?, ?)", (rel, mtime, duration, codec or "", width, height)
+            )
+        with self.pending_lock:
+            self.pending.pop(rel, None)
+        callback(rel)
+
+    def prune(self):
+        # Delete thumbnails whose clip is gone or changed.
+        with self.index.lock:
+            keep = {os.path.basename(self.thumb_path(rel, mtime))
+                    for rel, mtime in self.index.db.execute("SELECT path, mtime FROM clips")}
+        removed = 0
+        with os.scandir(self.CACHE_DIR) as entries:
+            for entry in entries:
+                if entry.name.endswith(".png") and entry.name not in keep:
+                    os.remove(entry.path)
+                    removed += 1
+        if removed:
+            print(f"[DEBUG] Pruned {removed} stale thumbnail(s)")
+
+    def shutdown(self):
+        self.cancel_except(())
+        self.pool.shutdown(wait=False)
+
+
+def events_socket_path(ip):
+    runtime = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    return os.path.join(runtime, f"ccgui-events-{os.getuid()}-{ip}.sock")
+
+
+def motion_hook(sock_path, *args):
+    # Shell command for a motion.conf hook: one datagram "<args...>" to sock_path.
+    # Plain python -c so it works without socat/nc; errors are ignored so a
+    # closed GUI never disturbs motion.
+    import shlex
+    sender = ('import socket,sys; socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)'
+              '.sendto(" ".join(sys.argv[2:]).encode(), sys.argv[1])')
+    return " ".join([shlex.quote(sys.executable), "-c", shlex.quote(sender), shlex.quote(sock_path)]
+                    + list(args) + ["2>/dev/null"])
+
+
+def set_motion_hook(text, key, command):
+    # Like set_motion_option, but keeps a user's own hook running after ours.
+    match = re.search(rf'^[ \t]*{re.escape(key)}[ \t]+(.*)$', text, re.MULTILINE)
+    existing = match.group(1).strip() if match else ""
+    if "ccgui-events" in existing:
+        existing = existing.split("2>/dev/null", 1)[1].lstrip(" ;")
+    return set_motion_option(text, key, f"{command} ; {existing}" if existing else command)
+
+
+class EventStore:
+    # Append-only log of motion events in the clip index database. Rows are
+    # only ever inserted; the (camera, kind, ts_ms) index serves range
+    # queries, and an hourly rollup kept up on append serves density over
+    # long ranges, so both stay in the millisecond range over months.
+    HOUR_MS = 3600 * 1000
+
+    def __init__(self, index):
+        self.index = index
+        with index.lock:
+            index.db.executescript("""
+                CREATE TABLE IF NOT EXISTS events (
+                    id INTEGER PRIMARY KEY,
+                    ts_ms INTEGER NOT NULL,
+                    camera TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    event_no INTEGER,
+                    clip TEXT
+                );
+                CREATE INDEX IF NOT EXISTS events_camera_ts ON events(camera, kind, ts_ms);
+                CREATE INDEX IF NOT EXISTS events_ts ON events(ts_ms);
+                CREATE TABLE IF NOT EXISTS event_hours (
+                    camera TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    hour INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (camera, kind, hour)
+                );
+            """)
+            if index.db.execute("SELECT NOT EXISTS (SELECT 1 FROM event_hours) AND EXISTS (SELECT 1 FROM events)").fetchone()[0]:
+                with index.db:
+                    index.db.execute(
+                        "INSERT INTO event_hours SELECT camera, kind, ts_ms / ?, COUNT(*) FROM events GROUP BY 1, 2, 3",
+                        (self.HOUR_MS,)
+                    )
+
+    def append(self, camera, kind, event_no=None, clip=None, ts_ms=None):
+        ts_ms = int(time.time() * 1000) if ts_ms is None else ts_ms
+        with self.index.lock, self.index.db:
+            self.index.db.execute(
+                "INSERT INTO events (ts_ms, camera, kind, event_no, clip) VALUES (?, ?, ?, ?, ?)",
+                (ts_ms, camera, kind, event_no, clip)
+            )
+            self.index.db.execute(
+                "INSERT INTO event_hours VALUES (?, ?, ?, 1) "
+                "ON CONFLICT(camera, kind, hour) DO UPDATE SET count = count + 1",
+                (camera, kind, ts_ms // self.HOUR_MS)
+            )
+        return ts_ms
+
+    def cameras(self):
+        # DISTINCT would scan every event; hop through the index instead.
+        cameras, last = [], ""
+        with self.index.lock:
+            while True:
+                row = self.index.db.execute(
+                    "SELECT camera FROM event_hours WHERE camera > ? ORDER BY camera LIMIT 1", (last,)
+                ).fetchone()
+                if row is None:
+                    return cameras
+                last = row[0]
+                cameras.append(last)
+
+    def between(self, start_ms, end_ms, camera=None, limit=10000):
+        query = "SELECT ts_ms, camera, kind, event_no, clip FROM events WHERE ts_ms >= ? AND ts_ms < ?"
+        params = [start_ms, end_ms]
+        if camera is not None:
+            query = query.replace("WHERE", "WHERE camera=? AND")
+            params.insert(0, camera)
+        with self.index.lock:
+            rows = self.index.db.execute(query + " ORDER BY ts_ms LIMIT ?", params + [limit]).fetchall()
+        return [dict(zip(("ts_ms", "camera", "kind", "event_no", "clip"), row)) for row in rows]
+
+    def density(self, start_ms, end_ms, buckets, kind="event_start"):
+        # {camera: [count per bucket]} for the timeline.
+        width = max(1, (end_ms - start_ms) // buckets + 1)
+        result = {}
+        for camera in self.cameras():
+            counts = result[camera] = [0] * buckets
+            with self.index.lock:
+                if width >= self.HOUR_MS:
+                    rows = self.index.db.execute(
+                        "SELECT hour * ?, count FROM event_hours WHERE camera=? AND kind=? AND hour >= ? AND hour <= ?",
+                        (self.HOUR_MS, camera, kind, start_ms // self.HOUR_MS, end_ms // self.HOUR_MS)
+                    ).fetchall()
+                else:
+                    rows = self.index.db.execute(
+                        "SELECT ts_ms, COUNT(*) FROM events WHERE camera=? AND kind=? AND ts_ms >= ? AND ts_ms < ? "
+                        "GROUP BY (ts_ms - ?) / ?",
+                        (camera, kind, start_ms, end_ms, start_ms, width)
+                    ).fetchall()
+            for ts_ms, count in rows:
+                bucket = max(0, min(int((ts_ms - start_ms) // width), buckets - 1))
+                counts[bucket] += count
+        return result
+
+    def clip_at(self, camera, ts_ms):
+        # First finished clip at or after ts_ms: the movie that holds that moment.
+        with self.index.lock:
+            row = self.index.db.execute(
+                "SELECT clip FROM events WHERE camera=? AND kind='movie_end' AND ts_ms >= ? "
+                "ORDER BY ts_ms LIMIT 1", (camera, ts_ms)
+            ).fetchone()
+        return row[0] if row else None
+
+
+class StagingFlusher:
+    # Write-behind staging: motion records into a RAM-backed directory
+    # (tmpfs) and this thread moves finished clips to save_dir in large
+    # sequential batches, so the SD card sees a few big writes instead of
+    # a constant trickle. Configured by the "staging" block of
+    # ~/.ptz_config.json:
+    #   dir             staging directory (default /dev/shm/ccgui-staging)
+    #   budget_bytes    RAM budget; crossing half of it triggers an early flush,
+    #                   crossing all of it force-flushes the oldest clips even
+    #                   if they haven't settled (see flush_over_budget)
+    #   flush_interval  seconds between regular flushes
+    #   batch_bytes     bytes copied per batch before the fsync barrier
+    #   settle_seconds  a clip untouched this long is considered finished
+    #   fsync           "file" (every clip), "batch" (once per batch) or "none"
+    # Clips are copied into save_dir/.inflight, synced, then renamed into
+    # place; recover() finishes or rolls back whatever a crash left there.
+    DEFAULT_DIR = "/dev/shm/ccgui-staging"
+    INFLIGHT = ".inflight"
+    POLL = 1.0
+    CHUNK = 4 * 1024 * 1024
+
+    def __init__(self, save_dir, settings, index=None):
+        self.save_dir = save_dir
+        self.settings = settings
+        self.index = index
+        self.dir = os.path.expanduser(settings.get('dir') or self.DEFAULT_DIR)
+        self.inflight = os.path.join(save_dir, self.INFLIGHT)
+        self.budget = parse_size(settings.get('budget_bytes', "256M"))
+        self.batch_bytes = parse_size(settings.get('batch_bytes', "64M"))
+        self.interval = settings.get('flush_interval', 30)
+        self.settle = settings.get('settle_seconds', 10)
+        self.fsync = settings.get('fsync', 'batch')
+        self.stop_event = threading.Event()
+        self.wake = threading.Event()
+        self.thread = None
+        self.over_budget = False
+        os.makedirs(self.dir, exist_ok=True)
+        os.makedirs(self.inflight, exist_ok=True)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.loop, name="staging", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        # The loop does the final flush itself once it sees the stop flag, so
+        # two threads never copy the same clip.
+        self.stop_event.set()
+        self.wake.set()
+        if self.thread is None:
+            self.flush(settle=0)
+            return
+        self.thread.join(timeout=60)
+        if self.thread.is_alive():
+            print("[DEBUG] Staging final flush still running after 60s; unflushed clips stay in "
+                  f"{self.dir} and are recovered on the next start")
+
+    def flush_soon(self):
+        self.wake.set()
+
+    def staged(self):
+        # [(rel, size, mtime)] oldest first; the staging tree is small and lives in RAM.
+        clips = []
+        for dirpath, dirnames, filenames in os.walk(self.dir):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for name in filenames:
+                if name.startswith(".") or not name.lower().endswith(VIDEO_EXTS):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                clips.append((os.path.relpath(path, self.dir), st.st_size, st.st_mtime))
+        clips.sort(key=lambda c: c[2])
+        return clips
+
+    def loop(self):
+        try:
+            self.recover()
+        except Exception as e:
+            print(f"[DEBUG] Staging recovery failed: {e}")
+        last_flush = time.monotonic()
+        while not self.stop_event.is_set():
+            woken = self.wake.wait(self.POLL)
+            self.wake.clear()
+            staged = self.staged()
+            total = sum(c[1] for c in staged)
+            METRICS.set_gauge("ccgui_staging_bytes", total)
+            if total > self.budget and not self.over_budget:
+                METRICS.inc("ccgui_staging_over_budget_total")
+                print(f"[DEBUG] Staging over budget: {total / 2**20:.0f} MB staged, budget {self.budget / 2**20:.0f} MB")
+            self.over_budget = total > self.budget
+            if woken or total >= self.budget / 2 or time.monotonic() - last_flush >= self.interval:
+                try:
+                    if self.over_budget:
+                        self.flush_over_budget(staged, total)
+                    else:
+                        self.flush(staged=staged)
+                except Exception as e:
+                    METRICS.inc("ccgui_staging_flush_errors_total")
+                    print(f"[DEBUG] Staging flush failed: {e}")
+                last_flush = time.monotonic()
+        # Final flush: everything left is treated as finished (motion is stopped first).
+        try:
+            self.flush(settle=0)
+        except Exception as e:
+            METRICS.inc("ccgui_staging_flush_errors_total")
+            print(f"[DEBUG] Staging final flush failed: {e}")
+
+    def flush(self, settle=None, staged=None):
+        settle = self.settle if settle is None else settle
+        cutoff = time.time() - settle
+        ready = [c for c in (staged if staged is not None else self.staged()) if c[2] <= cutoff]
+        batch, size = [], 0
+        for clip in ready:
+            batch.append(clip)
+            size += clip[1]
+            if size >= self.batch_bytes:
+                self.flush_batch(batch)
+                batch, size = [], 0
+        if batch:
+            self.flush_batch(batch)
+        return len(ready)
+
+    def flush_over_budget(self, staged, total):
+        # Over budget the tmpfs could fill and motion would lose frames, so
+        # don't wait for settle_seconds: move oldest clips until back under
+        # half the budget. The newest clip in each folder is left alone, as
+        # motion may still be writing it (moving it would cut it short).
+        newest = {}
+        for clip in staged:
+            newest[os.path.dirname(clip[0])] = clip[0]
+        batch, remaining = [], total
+        for clip in staged:
+            if remaining <= self.budget / 2:
+                break
+            if clip[0] in newest.values():
+                continue
+            batch.append(clip)
+            remaining -= clip[1]
+        if batch:
+            print(f"[DEBUG] Staging over budget, force-flushing {len(batch)} clip(s)")
+            self.flush_batch(batch)
+        # Whatever settled is flushed as usual.
+        self.flush()
+
+    def flush_batch(self, batch):
+        with METRICS.timed("ccgui_staging_flush_seconds"):
+            copied = []
+            for rel, size, mtime in batch:
+                tmp = os.path.join(self.inflight, rel)
+                os.makedirs(os.path.dirname(tmp), exist_ok=True)
+                self.copy(os.path.join(self.dir, rel), tmp, mtime, sync=self.fsync == "file")
+                copied.append(rel)
+            if self.fsync == "batch":
+                for rel in copied:
+                    fd = os.open(os.path.join(self.inflight, rel), os.O_RDONLY)
+                    try:
+                        os.fsync(fd)
+                    finally:
+                        os.close(fd)
+            for rel in copied:
+                self.commit(rel)
+            if self.fsync != "none":
+                for d in {os.path.dirname(os.path.join(self.save_dir, rel)) for rel in copied}:
+                    self.fsync_dir(d)
+        flushed = sum(c[1] for c in batch)
+        METRICS.inc("ccgui_staging_flushed_bytes_total", flushed)
+        print(f"[DEBUG] Flushed {len(batch)} staged clip(s), {flushed / 2**20:.1f} MB")
+
+    def copy(self, src, dst, mtime, sync):
+        with open(src, "rb") as fin, open(dst, "wb") as fout:
+            shutil.copyfileobj(fin, fout, self.CHUNK)
+            if sync:
+                fout.flush()
+                os.fsync(fout.fileno())
+        os.utime(dst, (time.time(), mtime))
+
+    def commit(self, rel, dst_rel=None):
+        # .inflight/<rel> -> save_dir/<dst_rel or rel>, then drop the RAM copy.
+        dst = os.path.join(self.save_dir, dst_rel or rel)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        os.replace(os.path.join(self.inflight, rel), dst)
+        try:
+            os.remove(os.path.join(self.dir, rel))
+        except FileNotFoundError:
+            pass
+        if self.index is not None:
+            self.index.add(dst)
+
+    def fsync_dir(self, path):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def recover(self):
+        # Leftovers in .inflight mean a crash mid-flush. If the staged copy
+        # survived (app crash), discard the partial and flush again; if it
+        # did not (power loss wiped tmpfs), the partial is all there is: keep
+        # it as <name>.partial<ext>, since it may be truncated or unsynced.
+        for dirpath, _, filenames in os.walk(self.inflight):
+            for name in filenames:
+                tmp = os.path.join(dirpath, name)
+                rel = os.path.relpath(tmp, self.inflight)
+                if os.path.exists(os.path.join(self.dir, rel)):
+                    os.remove(tmp)
+                    print(f"[DEBUG] Staging recovery: discarded partial {rel}, will flush again")
+                else:
+                    stem, ext = os.path.splitext(rel)
+                    self.commit(rel, f"{stem}.partial{ext}")
+                    print(f"[DEBUG] Staging recovery: salvaged {stem}.partial{ext} (staged copy lost)")
+        # A crash between rename and removing the staged copy leaves both;
+        # the staged copy is complete, so flushing it again is safe. Clips
+        # still being written (motion outlives a crashed GUI) wait to settle.
+        pending = self.staged()
+        if pending:
+            print(f"[DEBUG] Staging recovery: {len(pending)} clip(s) left in {self.dir}")
+            self.flush(staged=pending)
+
+
+class CamCommanderCore:
+    # --- Connection, PTZ, recording and child-process supervision ---
+    # Shared by the Tk GUI (PTZCameraControl) and the headless daemon
+    # (CamCommanderDaemon). Nothing in here may touch tkinter.
+
+    MOTION_RESTART_DELAY = 5
+    # Keepalive / reconnect defaults; each can be overridden in ~/.ptz_config.json.
+    KEEPALIVE_INTERVAL = 10
+    ONVIF_TIMEOUT = 5
+    RECONNECT_BASE = 1.0
+    RECONNECT_MAX = 60.0
+    PTZ_BUFFER_SIZE = 8
+    PTZ_BUFFER_TTL = 10.0
+    # Returned by PTZ commands that were buffered for replay instead of sent.
+    PTZ_QUEUED = "queued"
+
+    def __init__(self, ip, username, password):
+        self.save_dir = os.path.expanduser(SAVE_DIR)
+        self.motion_conf_path = os.path.join(self.save_dir, "motion.conf")
+        self.ip, self.username, self.password = ip, username, password
+        print(f"[DEBUG] Selected IP: {self.ip}")
+        print(f"[DEBUG] Selected Username: {self.username}")
+        with STARTUP.phase("credential_load"):
+            self.config = self.load_config()
+        print(f"[DEBUG] Loaded config: {redact_config(self.config)}")
+
+        self.camera = None
         self.ptz = None
         self.media = None
         self.profile = None
         self.token = None
+        # ONVIF calls can come from the API threads as well as the UI thread.
+        self.onvif_lock = threading.RLock()
+
+        # Session keepalive + background reconnect (see keepalive_loop).
+        self.auto_reconnect = self.config.get('auto_reconnect', True)
+        self.keepalive_thread = None
+        self.keepalive_stop = threading.Event()
+        self.keepalive_wake = threading.Event()
+        self.reconnect_attempt = 0
+        self.ptz_buffer = deque(maxlen=self.config.get('ptz_buffer_size', self.PTZ_BUFFER_SIZE))
 
         self.motion_proc = None
-        self.setup_ui()
-        self.connect_camera()
+        self.motion_wanted = False
+        self.motion_restarts = 0
+        self.motion_last_start = 0.0
+        self.mpv_proc = None
+        self.last_error = None
+        self._clip_index = None
+        self.retention = None
+        self.staging = None
+        self.media_catalog = None
+        self.events = None
+        self.events_sock = None
+
+    # --- Hooks overridden by the front-ends ---
+    def update_status(self, text, color):
+        print(f"[DEBUG] Status: {text.strip()}")
+
+    def show_error(self, title, message):
+        self.last_error = f"{title}: {message}"
+        print(f"[DEBUG] {title}: {message}")
+
+    def show_warning(self, title, message):
+        print(f"[DEBUG] {title}: {message}")
+
+    def on_motion_state(self, running):
+        pass
+
+    def on_recording_event(self, kind, clip):
+        pass
+
+    def on_initial_connect(self, ok):
+        pass
+
+    def load_config(self):
+        default_config = {
+            'ip': self.ip,
+            'port': 8899,
+            'username': self.username,
+            'password': self.password
+        }
+        try:
+            if CONFIG_PATH.exists():
+                with open(CONFIG_PATH) as f:
+                    config = json.load(f)
+                print(f"[DEBUG] Loaded config from file: {redact_config(config)}")
+            else:
+                config = default_config
+                print(f"[DEBUG] Using default config: {redact_config(config)}")
+
+            config['ip'] = self.ip
+            config['username'] = self.username
+            config['password'] = self.password
+            if 'port' not in config:
+                config['port'] = default_config['port']
+            return config
+        except Exception as e:
+            print(f"[DEBUG] Error loading config: {e}")
+            sys.exit(1)
+
+    def rtsp_url(self):
+        username = self.config.get('username', '')
+        password = self.config.get('password', '')
+        ip = self.config.get('ip')
+        rtsp_url = f"rtsp://{username}:{password}@{ip}:554/Streaming/Channels/101"
+        return rtsp_url.replace("::", ":")
+
+    def is_connected(self):
+        return self.ptz is not None and self.token is not None
+
+    def onvif_call(self, service, op, *args):
+        # Every ONVIF SOAP request goes through here: serialised and timed per camera/op.
+        # Network-level failures drop the session; SOAP faults mean the camera
+        # answered and are left to the caller.
+        try:
+            with self.onvif_lock, METRICS.timed("ccgui_onvif_call_seconds", camera=self.config['ip'], op=op):
+                return getattr(service, op)(*args)
+        except Exception as e:
+            if is_network_error(e):
+                self.mark_disconnected(f"{op}: {e}")
+            raise
+
+    def session_call(self, service, op, request):
+        # PTZ/media requests: the service and token are read under the lock,
+        # so a request that waited behind a failing keepalive probe sees the
+        # session was dropped and goes to the outage policy instead of timing
+        # out a second time against the dead service.
+        with self.onvif_lock:
+            if not self.is_connected():
+                raise ConnectionError("camera session lost")
+            return self.onvif_call(getattr(self, service), op, dict(request, ProfileToken=self.token))
+
+    def mark_disconnected(self, reason):
+        with self.onvif_lock:
+            if not self.is_connected():
+                return
+            self.ptz = None
+            self.token = None
+        METRICS.inc("ccgui_disconnects_total", camera=self.config['ip'])
+        METRICS.set_gauge("ccgui_camera_up", 0, camera=self.config['ip'])
+        print(f"[DEBUG] Camera connection lost: {reason}")
+        self.update_status("Connection lost – reconnecting…", "red")
+        self.keepalive_wake.set()
+
+    def start_keepalive(self, connect_first=False):
+        # connect_first: make the initial connect on this thread too, so the
+        # caller (the Tk loop) isn't blocked for up to onvif_timeout.
+        if not self.auto_reconnect or self.keepalive_thread is not None:
+            return
+        self.keepalive_thread = threading.Thread(
+            target=self.keepalive_loop, args=(connect_first,), name="keepalive", daemon=True
+        )
+        self.keepalive_thread.start()
+
+    def stop_keepalive(self):
+        self.keepalive_stop.set()
+        self.keepalive_wake.set()
+
+    def reconnect_delay(self):
+        # Exponential backoff with jitter so a fleet of recorders doesn't
+        # hammer a camera in lock-step after it reboots.
+        base = self.config.get('reconnect_base', self.RECONNECT_BASE)
+        cap = self.config.get('reconnect_max', self.RECONNECT_MAX)
+        ceiling = min(cap, base * 2 ** min(self.reconnect_attempt, 16))
+        return random.uniform(ceiling / 2, ceiling)
+
+    def keepalive_loop(self, connect_first=False):
+        interval = self.config.get('keepalive_interval', self.KEEPALIVE_INTERVAL)
+        if connect_first:
+            ok = self.connect_camera()
+            if ok:
+                self.flush_ptz_buffer()
+            self.on_initial_connect(ok)
+        while not self.keepalive_stop.is_set():
+            if self.is_connected():
+                self.reconnect_attempt = 0
+                self.keepalive_wake.wait(interval)
+                self.keepalive_wake.clear()
+                if self.keepalive_stop.is_set() or not self.is_connected():
+                    continue
+                try:
+                    self.onvif_call(self.camera.devicemgmt, "GetSystemDateAndTime")
+                except Exception as e:
+                    # Network errors already marked the session as lost in onvif_call.
+                    if not is_network_error(e):
+                        print(f"[DEBUG] Keepalive probe answered with an error (camera is up): {e}")
+                continue
+
+            delay = self.reconnect_delay()
+            self.reconnect_attempt += 1
+            print(f"[DEBUG] Reconnect attempt {self.reconnect_attempt} in {delay:.1f}s")
+            self.update_status(f"Camera offline – retrying in {delay:.0f}s", "red")
+            if self.keepalive_stop.wait(delay):
+                break
+            if self.connect_camera():
+                METRICS.inc("ccgui_reconnects_total", camera=self.config['ip'])
+                self.flush_ptz_buffer()
+
+    def handle_ptz_outage(self, command, *args):
+        # PTZ command issued while the camera is unreachable: queue or drop it
+        # according to "ptz_outage_policy", never pop up a dialog. Returns
+        # PTZ_QUEUED when buffered, False when dropped.
+        policy = self.config.get('ptz_outage_policy', 'drop')
+        METRICS.inc("ccgui_ptz_outage_commands_total", camera=self.config['ip'], policy=policy)
+        if policy == 'buffer':
+            self.ptz_buffer.append((time.monotonic(), command, args))
+            print(f"[DEBUG] Camera offline, queued {command}{args}")
+            self.update_status(f"Camera offline – {len(self.ptz_buffer)} command(s) queued", "orange")
+            self.keepalive_wake.set()
+            return self.PTZ_QUEUED
+        print(f"[DEBUG] Camera offline, dropped {command}{args}")
+        self.last_error = f"Camera offline, {command} dropped"
+        self.update_status("Camera offline – command dropped", "orange")
+        self.keepalive_wake.set()
+        return False
+
+    def flush_ptz_buffer(self):
+        ttl = self.config.get('ptz_buffer_ttl', self.PTZ_BUFFER_TTL)
+        now = time.monotonic()
+        while self.ptz_buffer and self.is_connected():
+            queued_at, command, args = self.ptz_buffer.popleft()
+            if now - queued_at > ttl:
+                print(f"[DEBUG] Discarding stale queued {command}{args}")
+                continue
+            print(f"[DEBUG] Replaying queued {command}{args}")
+            getattr(self, command)(*args)
+
+    def connect_camera(self):
+        print(f"[DEBUG] Connecting to camera at {self.config['ip']}:{self.config['port']}")
+        print(f"[DEBUG] Username: {self.config['username']}")
+        try:
+            with METRICS.timed("ccgui_connect_seconds", camera=self.config['ip']):
+                with STARTUP.phase("imports"):
+                    import onvif
+                    from onvif import ONVIFCamera
+                    from zeep.transports import Transport
+                wsdl_path = self.config.get('wsdl_path') or DEFAULT_WSDL_PATH
+                if not Path(wsdl_path).is_dir() and 'wsdl_path' not in self.config:
+                    # onvif-zeep ships its WSDLs next to the package.
+                    wsdl_path = os.path.join(os.path.dirname(os.path.dirname(onvif.__file__)), "wsdl")
+                if not Path(wsdl_path).is_dir():
+                    raise Exception(f"WSDL path not found: {wsdl_path}")
+                # Without an operation timeout a dead camera blocks a call forever.
+                timeout = self.config.get('onvif_timeout', self.ONVIF_TIMEOUT)
+                with self.onvif_lock:
+                    with STARTUP.phase("wsdl_build"):
+                        self.camera = ONVIFCamera(
+                            self.config['ip'],
+                            self.config['port'],
+                            self.config['username'],
+                            self.config['password'],
+                            wsdl_path,
+                            transport=Transport(timeout=timeout * 2, operation_timeout=timeout)
+                        )
+                        self.media = self.camera.create_media_service()
+                        self.ptz = self.camera.create_ptz_service()
+                    with STARTUP.phase("connect"):
+                        self.profile = self.onvif_call(self.media, "GetProfiles")[0]
+                        self.token = self.profile.token
+            print(f"[DEBUG] Connected to camera. Profile token: {self.token}")
+            self.last_error = None
+            METRICS.set_gauge("ccgui_camera_up", 1, camera=self.config['ip'])
+            self.update_status("Connected", "green")
+            return True
+        except Exception as e:
+            self.ptz = None  # Explicitly set to None on error
+            self.token = None
+            METRICS.set_gauge("ccgui_camera_up", 0, camera=self.config['ip'])
+            if self.auto_reconnect:
+                # The keepalive thread keeps retrying in the background.
+                self.last_error = f"Failed to connect to camera: {e}"
+                print(f"[DEBUG] {self.last_error}")
+                self.update_status("Connection Failed – retrying", "red")
+                self.keepalive_wake.set()
+            else:
+                self.update_status("Connection Failed", "red")
+                self.show_error("Error", f"Failed to connect to camera: {str(e)}")
+            return False
+
+    def move(self, x, y):
+        try:
+            if not self.is_connected():
+                if self.auto_reconnect:
+                    return self.handle_ptz_outage("move", x, y)
+                self.update_status("PTZ not connected", "red")
+                self.show_error("Movement Error", "PTZ service not connected.")
+                return False
+            print(f"[DEBUG] Moving: x={x}, y={y}")
+            self.session_call("ptz", "ContinuousMove", {
+                'Velocity': {'PanTilt': {'x': x, 'y': y}}
+            })
+            return True
+        except Exception as e:
+            if is_network_error(e) and self.auto_reconnect:
+                return self.handle_ptz_outage("move", x, y)
+            self.update_status("Movement Error", "red")
+            self.show_error("Error", f"Movement failed: {str(e)}")
+            return False
+
+    def go_to_center(self):
+        try:
+            if not self.is_connected() and self.auto_reconnect:
+                return self.handle_ptz_outage("go_to_center")
+            print("[DEBUG] Going to center preset (x=0, y=0)")
+            self.session_call("ptz", "AbsoluteMove", {
+                'Position': {'PanTilt': {'x': 0, 'y': 0}}
+            })
+            self.update_status(
+                "🟢 Streaming RTSP via MPV\n"
+                "🎮 Actively controlling movement through:\n"
+                "   ONVIF PTZ (Pan-Tilt-Zoom) API\n"
+                "🌐 Web UI via MotionEye Local Server\n",
+                "#13ad39"
+            )
+            return True
+        except Exception as e:
+            if is_network_error(e) and self.auto_reconnect:
+                return self.handle_ptz_outage("go_to_center")
+            self.update_status("Connection Error", "red")
+            self.show_error("Error", f"Connecting failed: {str(e)}")
+            return False
+
+    def stop_ptz(self):
+        try:
+            if not self.is_connected():
+                if self.auto_reconnect:
+                    return self.handle_ptz_outage("stop_ptz")
+                self.show_error("Stop Error", "PTZ service not connected.")
+                return False
+            print("[DEBUG] Stop PTZ")
+            self.session_call("ptz", "Stop", {})
+            return True
+        except Exception as e:
+            if is_network_error(e) and self.auto_reconnect:
+                return self.handle_ptz_outage("stop_ptz")
+            self.update_status("Stop Error", "red")
+            self.show_error("Error", f"Stop failed: {str(e)}")
+            return False
+
+    def take_snapshot(self):
+        snap_dir = os.path.join(self.save_dir, "snapshots")
+        os.makedirs(snap_dir, exist_ok=True)
+        out_path = os.path.join(
+            snap_dir, datetime.datetime.now().strftime("snapshot-%Y%m%d-%H%M%S.jpg")
+        )
+        try:
+            if not self.is_connected():
+                raise Exception("PTZ service not connected.")
+            uri = self.session_call("media", "GetSnapshotUri", {}).Uri
+            print(f"[DEBUG] Fetching ONVIF snapshot from {redact_url(uri)}")
+            import urllib.request
+            passwords = urllib.request.HTTPPasswordMgrWithDefaultRealm()
+            passwords.add_password(None, uri, self.config['username'], self.config['password'])
+            opener = urllib.request.build_opener(
+                urllib.request.HTTPDigestAuthHandler(passwords),
+                urllib.request.HTTPBasicAuthHandler(passwords)
+            )
+            with opener.open(uri, timeout=10) as resp, open(out_path, "wb") as f:
+                f.write(resp.read())
+        except Exception as e:
+            # Many cheap cameras have no snapshot URI; grab a frame from RTSP instead.
+            print(f"[DEBUG] ONVIF snapshot failed ({redact_url(str(e))}), falling back to ffmpeg")
+            result = subprocess.run(
+                ['ffmpeg', '-loglevel', 'error', '-y', '-rtsp_transport', 'tcp',
+                 '-i', self.rtsp_url(), '-frames:v', '1', out_path],
+                capture_output=True, text=True, timeout=20
+            )
+            if result.returncode != 0:
+                # ffmpeg starts its errors with the input URL, credentials included.
+                stderr = redact_url(result.stderr.strip())
+                if self.config.get('password'):
+                    stderr = stderr.replace(self.config['password'], "***")
+                raise Exception(f"Snapshot failed: {stderr}")
+        print(f"[DEBUG] Snapshot saved to {out_path}")
+        return out_path
+
+    def launch_mpv_stream(self):
+        rtsp_url = self.rtsp_url()
+        print(f"[DEBUG] Attempting to launch /usr/bin/mpv with RTSP URL: {redact_url(rtsp_url)}")
+        try:
+            self.mpv_proc = subprocess.Popen([
+                '/usr/bin/mpv',
+                '--demuxer-lavf-o=rtsp_transport=tcp',
+                rtsp_url
+            ])
+            self.child_started("mpv")
+            print("[DEBUG] mpv launched successfully.")
+        except Exception as e:
+            print(f"[DEBUG] Failed to launch mpv: {e}")
+
+    @property
+    def clip_index(self):
+        if self._clip_index is None:
+            self._clip_index = ClipIndex(self.save_dir)
+        return self._clip_index
+
+    def list_recordings(self):
+        self.clip_index.sync()
+        return self.clip_index.paths()
+
+    def recordings_summary(self):
+        with METRICS.timed("ccgui_recording_scan_seconds"):
+            self.clip_index.sync()
+            totals = self.clip_index.totals().values()
+        num_files = sum(t[0] for t in totals)
+        total_bytes = sum(t[1] for t in totals)
+        free = shutil.disk_usage(self.save_dir).free
+        METRICS.set_gauge("ccgui_recording_files", num_files)
+        METRICS.set_gauge("ccgui_recording_bytes", total_bytes)
+        METRICS.set_gauge("ccgui_disk_free_bytes", free)
+        if num_files == 0:
+            return "No saved videos yet."
+        first_time = datetime.datetime.fromtimestamp(min(t[2] for t in totals)).strftime('%Y-%m-%d %H:%M')
+        last_time = datetime.datetime.fromtimestamp(max(t[3] for t in totals)).strftime('%Y-%m-%d %H:%M')
+        total_mb = total_bytes / (1024 * 1024)
+        summary = f"Count: {num_files} | Oldest: {first_time} | Newest: {last_time} | Size: {total_mb:.1f} MB"
+        if total_mb > 1024:
+            summary += f" ({total_mb/1024:.2f} GB)"
+        summary += f" | Free: {free / 1024**3:.1f} GB"
+        return summary
+
+    def start_retention(self, on_change=None):
+        settings = self.config.get('retention')
+        if not settings:
+            return
+        self.retention = RetentionManager(self.clip_index, settings, on_change)
+        self.retention.start()
+        print(f"[DEBUG] Retention enabled: {settings}")
+
+    def stop_retention(self):
+        if self.retention is not None:
+            self.retention.stop()
+
+    def start_staging(self):
+        settings = self.config.get('staging')
+        if not settings or not settings.get('enabled', True):
+            return
+        try:
+            self.staging = StagingFlusher(self.save_dir, settings, self.clip_index)
+            self.staging.start()
+            print(f"[DEBUG] Staging recordings in {self.staging.dir}")
+        except OSError as e:
+            self.staging = None
+            print(f"[DEBUG] Staging disabled, recording straight to {self.save_dir}: {e}")
+
+    def stop_staging(self):
+        if self.staging is not None:
+            self.staging.stop()
+
+    def recording_dir(self):
+        return self.staging.dir if self.staging is not None else self.save_dir
+
+    # --- Motion event channel ---
+    # motion's on_event_start / on_movie_end hooks send one datagram each to
+    # a per-camera Unix socket; events go to the EventStore and new clips
+    # straight into the clip index (or the staging flusher).
+    def start_event_listener(self):
+        self.events = EventStore(self.clip_index)
+        path = events_socket_path(self.config['ip'])
+        try:
+            if os.path.exists(path):
+                os.unlink(path)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sock.bind(path)
+            os.chmod(path, 0o600)
+        except OSError as e:
+            print(f"[DEBUG] Motion event socket unavailable ({path}): {e}")
+            return
+        self.events_sock = sock
+        threading.Thread(target=self.event_listener_loop, args=(sock,), name="motion-events", daemon=True).start()
+        print(f"[DEBUG] Listening for motion events on {path}")
+
+    def stop_event_listener(self):
+        if self.events_sock is None:
+            return
+        path = self.events_sock.getsockname()
+        self.events_sock.close()
+        self.events_sock = None
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def event_listener_loop(self, sock):
+        while True:
+            try:
+                message = sock.recv(4096).decode(errors="replace").strip()
+            except OSError:
+                return  # socket closed by stop_event_listener
+            try:
+                self.handle_motion_event(message)
+            except Exception as e:
+                print(f"[DEBUG] Bad motion event {message!r}: {e}")
+
+    def handle_motion_event(self, message):
+        kind, _, rest = message.partition(" ")
+        event_no, _, path = rest.partition(" ")
+        clip = None
+        if kind == "movie_end" and path:
+            rec_dir = self.recording_dir()
+            clip = os.path.relpath(path, rec_dir) if path.startswith(rec_dir + os.sep) else path
+            if self.staging is not None and path.startswith(self.staging.dir + os.sep):
+                self.staging.flush_soon()
+            elif os.path.exists(path):
+                self.clip_index.add(path)
+        elif kind != "event_start":
+            raise ValueError(f"unknown event kind {kind}")
+        self.events.append(self.config['ip'], kind, int(event_no) if event_no.isdigit() else None, clip)
+        METRICS.inc("ccgui_motion_events_total", kind=kind)
+        print(f"[DEBUG] Motion event: {kind} #{event_no} {clip or ''}")
+        self.on_recording_event(kind, clip)
+
+    def clip_path(self, rel):
+        # Recorded clips live in save_dir, or briefly in staging before the flush.
+        path = os.path.join(self.save_dir, rel)
+        if not os.path.exists(path) and self.staging is not None:
+            staged = os.path.join(self.staging.dir, rel)
+            if os.path.exists(staged):
+                return staged
+        return path
+
+    def start_motion(self):
+        config_path = self.motion_conf_path
+        ip = self.config['ip']
+        user = self.config['username']
+        password = self.config['password']
+        rtsp_repl = f'rtsp://{user}:{password}@{ip}:554/Streaming/Channels/101'
+        print(f"[DEBUG] Using motion.conf file: {config_path}")
+        try:
+            with open(config_path) as f:
+                text = f.read()
+            text = re.sub(
+                r'rtsp://[^:@]+:[^@]+@[\d\.]+:554/Streaming/Channels/101',
+                rtsp_repl,
+                text
+            )
+            text = re.sub(
+                r'rtsp://[^:@]+:[^@]+@[\d\.]+:554',
+                f'rtsp://{user}:{password}@{ip}:554',
+                text
+            )
+            text = set_motion_option(text, "target_dir", self.recording_dir())
+            if self.events_sock is not None:
+                sock_path = self.events_sock.getsockname()
+                text = set_motion_hook(text, "on_event_start", motion_hook(sock_path, "event_start", "%v"))
+                text = set_motion_hook(text, "on_movie_end", motion_hook(sock_path, "movie_end", "%v", "%f"))
+            with open(config_path, "w") as f:
+                f.write(text)
+            self.motion_proc = subprocess.Popen(['motion', '-c', config_path])
+            self.child_started("motion")
+            self.motion_wanted = True
+            self.motion_last_start = time.monotonic()
+            print("[DEBUG] Motion started with updated config.")
+            self.update_status("Motion running", "blue")
+            self.on_motion_state(True)
+            return True
+        except Exception as e:
+            print(f"[DEBUG] Failed to start motion: {e}")
+            self.show_error("Error", f"Failed to start motion: {e}")
+            return False
+
+    def stop_motion(self):
+        self.motion_wanted = False
+        if self.motion_proc is not None:
+            print("[DEBUG] Stopping motion process...")
+            try:
+                self.motion_proc.terminate()
+                self.motion_proc.wait(timeout=5)
+                self.child_exited("motion", "stopped")
+                print("[DEBUG] Motion process terminated.")
+                self.update_status("Motion stopped", "orange")
+            except Exception as e:
+                print(f"[DEBUG] Error terminating motion: {e}")
+                self.show_error("Error", f"Error stopping motion: {e}")
+            finally:
+                self.motion_proc = None
+                self.on_motion_state(False)
+            return True
+        print("[DEBUG] No running motion process.")
+        return False
+
+    def supervise_children(self):
+        # Reap exited children and bring motion back if it died while wanted.
+        if self.mpv_proc is not None and self.mpv_proc.poll() is not None:
+            print(f"[DEBUG] mpv exited with code {self.mpv_proc.returncode}")
+            self.child_exited("mpv", "exited")
+            self.mpv_proc = None
+        if self.motion_proc is None or self.motion_proc.poll() is None:
+            return
+        code = self.motion_proc.returncode
+        self.motion_proc = None
+        self.child_exited("motion", "crashed" if self.motion_wanted else "exited")
+        if not self.motion_wanted:
+            return
+        print(f"[DEBUG] Motion exited unexpectedly with code {code}")
+        if time.monotonic() - self.motion_last_start < self.MOTION_RESTART_DELAY:
+            # Dies straight after launch: config or camera problem, don't spin.
+            self.motion_wanted = False
+            self.update_status("Motion crashed", "red")
+            self.on_motion_state(False)
+            return
+        self.motion_restarts += 1
+        print(f"[DEBUG] Restarting motion (restart #{self.motion_restarts})")
+        self.start_motion()
+
+    def child_started(self, name):
+        METRICS.inc("ccgui_child_starts_total", child=name)
+        METRICS.set_gauge("ccgui_child_up", 1, child=name)
+
+    def child_exited(self, name, reason):
+        METRICS.inc("ccgui_child_exits_total", child=name, reason=reason)
+        METRICS.set_gauge("ccgui_child_up", 0, child=name)
+        METRICS.set_gauge("ccgui_child_rss_bytes", 0, child=name)
+
+    def serve_metrics(self, addr):
+        server = make_api_server(self, addr, MetricsMixin)
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        print(f"[DEBUG] Metrics on http://{addr}/metrics (JSON: /metrics.json)")
+        return server
+
+    def collect_process_metrics(self):
+        # Refreshed on every scrape rather than on a timer.
+        stats = proc_stats()
+        if stats:
+            rss, cpu, threads = stats
+        else:
+            times = os.times()
+            rss, cpu, threads = None, times.user + times.system, threading.active_count()
+        if rss is not None:
+            METRICS.set_gauge("ccgui_process_rss_bytes", rss)
+        METRICS.set_gauge("ccgui_process_cpu_seconds", round(cpu, 3))
+        METRICS.set_gauge("ccgui_process_threads", threads)
+        for name, proc in (("motion", self.motion_proc), ("mpv", self.mpv_proc)):
+            stats = proc_stats(proc.pid) if proc is not None else None
+            if stats:
+                METRICS.set_gauge("ccgui_child_rss_bytes", stats[0], child=name)
+                METRICS.set_gauge("ccgui_child_cpu_seconds", round(stats[1], 3), child=name)
+
+    def status(self):
+        return {
+            'ip': self.config['ip'],
+            'port': self.config['port'],
+            'connected': self.is_connected(),
+            'reconnect_attempt': self.reconnect_attempt,
+            'ptz_queued': len(self.ptz_buffer),
+            'profile_token': self.token,
+            'motion_running': self.motion_proc is not None,
+            'motion_restarts': self.motion_restarts,
+            'mpv_running': self.mpv_proc is not None,
+            'save_dir': self.save_dir,
+            'recordings': self.recordings_summary(),
+        }
+
+
+class PTZCameraControl(CamCommanderCore):
+    SUPERVISE_INTERVAL_MS = 2000
+    UI_QUEUE_INTERVAL_MS = 100
+
+    def __init__(self, cli_ip=None, quit_after_startup=False, metrics_addr=None):
+        print("[DEBUG] Starting PTZCameraControl...")
+        _import_tk()
+        self.status_label = None
+        # Tk is not thread-safe: background threads hand UI work to the Tk loop through this.
+        self.ui_queue = queue.Queue()
+        self.summary_running = False
+        self.summary_stale = False
+        self.quit_after_startup = quit_after_startup
+        self.ptz_worker = None
+        action = {}
+        ip, username, password, action = self.get_ip_user_pass_with_action(cli_ip)
+        super().__init__(ip, username, password)
+        if metrics_addr:
+            self.serve_metrics(metrics_addr)
+
+        with STARTUP.phase("first_paint"):
+            self.root = tk.Tk()
+            self.root.title("CamCommander - PTZ Ctrl + NVR Recording GUI")
+            self.root.geometry("380x680")
+            self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+            self.status_label = tk.Label(
+                self.root, text="Disconnected", fg="red",
+                font=("Helvetica", 22, "bold")
+            )
+            self.status_label.pack(pady=10)
+
+            self.setup_ui()
+            # Show the window before the (slow) ONVIF connect; icons follow once idle.
+            self.root.update()
         # --- Quick-launch ---
-        if action.get("motioneye") and action.get("mpv"):
+        # motionEye is checked/started on a worker, so it warms up while the camera connects.
+        if action.get("motioneye"):
             self.open_motioneye(quiet=True)
+        from concurrent.futures import ThreadPoolExecutor
+        # PTZ requests can wait up to onvif_timeout (behind a keepalive probe
+        # or on a dead camera); one worker keeps them in click order off Tk.
+        self.ptz_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ptz")
+        # --profile-startup reports once these are done.
+        self.startup_waiting = {"icons"}
+        if self.auto_reconnect:
+            self.startup_waiting.add("connect")
+            self.start_keepalive(connect_first=True)
+        else:
+            self.connect_camera()
+        self.root.after_idle(self.load_icons)
+        if action.get("mpv"):
             self.launch_mpv_stream()
-        elif action.get("motioneye"):
-            self.open_motioneye(quiet=True)
-        elif action.get("mpv"):
-            self.launch_mpv_stream()
+        self.root.after(self.SUPERVISE_INTERVAL_MS, self.supervise_tick)
+        self.root.after(self.UI_QUEUE_INTERVAL_MS, self.drain_ui_queue)
+        self.start_staging()
+        self.start_event_listener()
+        self.start_retention(on_change=lambda: self.call_in_ui(self.update_video_summary))
         self.root.mainloop()
+        self.stop_event_listener()
+        self.stop_staging()
+        self.stop_retention()
+        self.stop_keepalive()
+        self.ptz_worker.shutdown(wait=False)
 
-    def get_ip_user_pass_with_action(self):
-        ips_path = Path.home() / '.ptz_ips.json'
-        creds_path = Path.home() / '.ptz_camera_creds.json'
-
-        previous_ips = []
-        if ips_path.exists():
-            with open(ips_path) as f:
-                previous_ips = json.load(f)
-            print(f"[DEBUG] Loaded previous IPs: {previous_ips}")
+    def get_ip_user_pass_with_action(self, cli_ip=None):
+        with STARTUP.phase("credential_load"):
+            previous_ips, creds = load_saved_logins()
 
-        creds = {}
-        if creds_path.exists():
-            with open(creds_path) as f:
-                creds = json.load(f)
-            print(f"[DEBUG] Loaded previous creds for IPs: {list(creds.keys())}")
-
-        if len(sys.argv) > 1:
-            ip = sys.argv[1]
+        if cli_ip:
+            ip = cli_ip
             user = creds.get(ip, {}).get("username", "")
             passwd = creds.get(ip, {}).get("password", "")
-            if ip not in previous_ips:
-                previous_ips.append(ip)
-                with open(ips_path, 'w') as f:
-                    json.dump(previous_ips, f)
+            remember_ip(ip, previous_ips)
             return ip, user, passwd, {}
 
+        dialog_start = time.perf_counter()
         root = tk.Tk()
         root.title("Cam Commander GUI")
         root.withdraw()
@@ -138,108 +2322,29 @@ class PTZCameraControl:
         tk.Button(prompt_buttons, text="3. Launch Both", width=22, command=lambda: do_launch(True, True)).pack(pady=2)
         tk.Button(prompt_buttons, text="4. None / Decide Later", width=22, command=lambda: do_launch(False, False)).pack(pady=(2,6))
 
-        root.mainloop()
-        prompt_buttons.destroy()
-        prompt.destroy()
-        root.destroy()
-
-        if not ip:
-            print("[DEBUG] No IP address entered. Exiting.")
-            sys.exit(1)
-        if ip not in previous_ips:
-            previous_ips.append(ip)
-            with open(ips_path, 'w') as f:
-                json.dump(previous_ips, f)
-        if not user: user = ""
-        if not passwd: passwd = ""
-        creds[ip] = {"username": user, "password": passwd}
-        with open(creds_path, "w") as f:
-            json.dump(creds, f)
-        return ip, user, passwd, action
-
-    def load_config(self):
-        config_path = Path.home() / '.ptz_config.json'
-        default_config = {
-            'ip': self.ip,
-            'port': 8899,
-            'username': self.username,
-            'password': self.password
-        }
-        try:
-            if config_path.exists():
-                with open(config_path) as f:
-                    config = json.load(f)
-                print(f"[DEBUG] Loaded config from file: {config}")
-            else:
-                config = default_config
-                print(f"[DEBUG] Using default config: {config}")
-
-            config['ip'] = self.ip
-            config['username'] = self.username
-            config['password'] = self.password
-            if 'port' not in config:
-                config['port'] = default_config['port']
-            return config
-        except Exception as e:
-            print(f"[DEBUG] Error loading config: {e}")
-            sys.exit(1)
-
-    def connect_camera(self):
-        print(f"[DEBUG] Connecting to camera at {self.config['ip']}:{self.config['port']}")
-        print(f"[DEBUG] Username: {self.config['username']}, Password: {self.config['password']}")
-        try:
-            wsdl_path = '/home/x/onvif/wsdl/'
-            if not Path(wsdl_path).is_dir():
-                raise Exception(f"WSDL path not found: {wsdl_path}")
-            self.camera = ONVIFCamera(
-                self.config['ip'],
-                self.config['port'],
-                self.config['username'],
-                self.config['password'],
-                wsdl_path
-            )
-            self.media = self.camera.create_media_service()
-            self.ptz = self.camera.create_ptz_service()
-            self.profile = self.media.GetProfiles()[0]
-            self.token = self.profile.token
-            print(f"[DEBUG] Connected to camera. Profile token: {self.token}")
-            self.update_status("Connected", "green")
-        except Exception as e:
-            self.ptz = None  # Explicitly set to None on error
-            self.token = None
-            self.update_status("Connection Failed", "red")
-            messagebox.showerror("Error", f"Failed to connect to camera: {str(e)}")
+        root.mainloop()
+        prompt_buttons.destroy()
+        prompt.destroy()
+        root.destroy()
+        STARTUP.add("login_dialog", time.perf_counter() - dialog_start)
 
-    def launch_mpv_stream(self):
-        username = self.config.get('username', '')
-        password = self.config.get('password', '')
-        ip = self.config.get('ip')
-        rtsp_url = f"rtsp://{username}:{password}@{ip}:554/Streaming/Channels/101"
-        rtsp_url = rtsp_url.replace("::", ":")
-        print(f"[DEBUG] Attempting to launch /usr/bin/mpv with RTSP URL: {rtsp_url}")
-        try:
-            subprocess.Popen([
-                '/usr/bin/mpv',
-                '--demuxer-lavf-o=rtsp_transport=tcp',
-                rtsp_url
-            ])
-            print("[DEBUG] mpv launched successfully.")
-        except Exception as e:
-            print(f"[DEBUG] Failed to launch mpv: {e}")
+        if not ip:
+            print("[DEBUG] No IP address entered. Exiting.")
+            sys.exit(1)
+        remember_ip(ip, previous_ips)
+        if not user: user = ""
+        if not passwd: passwd = ""
+        creds[ip] = {"username": user, "password": passwd}
+        with open(CREDS_PATH, "w") as f:
+            json.dump(creds, f)
+        return ip, user, passwd, action
 
     def setup_ui(self):
         print("[DEBUG] Setting up UI...")
 
-        # --- MotionEye blue icon at the top (decorative, 2x stretch) ---
-        try:
-            icon_path = os.path.join(os.path.dirname(__file__), "icons", "MotionEye-Blue-64x64-Icon.png")
-            self.icon_img = tk.PhotoImage(file=icon_path)
-            if hasattr(self.icon_img, "zoom"):
-                self.icon_img = self.icon_img.zoom(2, 2)
-            icon_label = tk.Label(self.root, image=self.icon_img)
-            icon_label.pack(pady=(10, 0))
-        except Exception as e:
-            print(f"[DEBUG] Icon could not be loaded: {e}")
+        # --- MotionEye blue icon at the top (decorative, 2x stretch, filled in by load_icons) ---
+        self.icon_label = tk.Label(self.root)
+        self.icon_label.pack(pady=(10, 0))
 
         # --- PTZ Control Buttons ---
         control_frame = ttk.Frame(self.root)
@@ -261,7 +2366,7 @@ class PTZCameraControl:
                     bg="#ddd",
                     relief="raised",
                     bd=3,
-                    command=self.go_to_center
+                    command=lambda: self.run_ptz("go_to_center")
                 )
             else:
                 btn = tk.Button(
@@ -272,7 +2377,7 @@ class PTZCameraControl:
                     bg="#ddd",
                     relief="raised",
                     bd=3,
-                    command=lambda x=dx, y=dy: self.move(x, y)
+                    command=lambda x=dx, y=dy: self.run_ptz("move", x, y)
                 )
             btn.grid(row=i//3, column=i%3, padx=2, pady=2, sticky="nsew")
         for i in range(3):
@@ -298,31 +2403,21 @@ class PTZCameraControl:
         )
         self.stop_motion_btn.pack(pady=2)
 
-        # --- MPV Stream Button (with icon) ---
-        mpv_icon_path = os.path.join(os.path.dirname(__file__), "icons", "mpv-64x64-icon.png")
+        # --- MPV Stream Button (icon added by load_icons) ---
+        self.mpv_btn = tk.Button(
+            self.root, text="Start MPV Stream",
+            font=("Helvetica", 12, "bold"),
+            command=self.launch_mpv_stream
+        )
+        self.mpv_btn.pack(pady=(10, 0))
 
-        if os.path.exists(mpv_icon_path):
-            try:
-                self.mpv_icon_img = tk.PhotoImage(file=mpv_icon_path)
-                mpv_btn = tk.Button(
-                    self.root, image=self.mpv_icon_img, compound="left",
-                    text="  Start MPV Stream  ", font=("Helvetica", 12, "bold"),
-                    command=self.launch_mpv_stream
-                )
-                mpv_btn.pack(pady=(10, 0))
-            except Exception as e:
-                print(f"[DEBUG] MPV icon could not be loaded: {e}")
-                tk.Button(
-                    self.root, text="Start MPV Stream",
-                    font=("Helvetica", 12, "bold"),
-                    command=self.launch_mpv_stream
-                ).pack(pady=(10, 0))
-        else:
-            tk.Button(
-                self.root, text="Start MPV Stream",
-                font=("Helvetica", 12, "bold"),
-                command=self.launch_mpv_stream
-            ).pack(pady=(10, 0))
+        # --- Tools row ---
+        self.tools_frame = tk.Frame(self.root)
+        self.tools_frame.pack(pady=(8, 0))
+        tk.Button(self.tools_frame, text="🩺 Fleet Health", font=("Helvetica", 10, "bold"), command=self.open_fleet_health).pack(side="left", padx=2)
+        tk.Button(self.tools_frame, text="🎞️ Recordings", font=("Helvetica", 10, "bold"), command=self.open_recordings_browser).pack(side="left", padx=2)
+        tk.Button(self.tools_frame, text="📈 Timeline", font=("Helvetica", 10, "bold"), command=self.open_timeline).pack(side="left", padx=2)
+        tk.Button(self.tools_frame, text="📤 Export", font=("Helvetica", 10, "bold"), command=self.open_export).pack(side="left", padx=2)
 
         tk.Label(self.root).pack(expand=True)
 
@@ -335,33 +2430,30 @@ class PTZCameraControl:
         refresh_btn = tk.Button(save_dir_frame, text="🔄 Refresh", font=("Helvetica", 10, "bold"), command=self.update_video_summary)
         refresh_btn.pack(side="left", padx=(4, 0))
 
-        self.video_summary_label = tk.Label(self.root, text="", font=("Helvetica", 9))
+        self.video_summary_label = tk.Label(self.root, text="Counting recordings…", font=("Helvetica", 9))
         self.video_summary_label.pack(pady=(0, 6))
         self.update_video_summary()
 
-        try:
-            laptop_icon_path = os.path.join(
-                os.path.dirname(__file__), "icons", "Laptop-Ip-Cam-WebPage-Icon-Scaled-64x64.png"
-            )
-            self.laptop_icon_img = tk.PhotoImage(file=laptop_icon_path)
-            laptop_btn = tk.Button(
-                self.root,
-                image=self.laptop_icon_img,
-                borderwidth=0,
-                highlightthickness=0,
-                command=self.open_motioneye,
-                cursor="hand2",
-                bg="#f5f5f5",
-                activebackground="#e0e0e0"
-            )
-            laptop_btn.pack(pady=(0, 1), side="bottom")
-        except Exception as e:
-            print(f"[DEBUG] Laptop icon could not be loaded: {e}")
+        # --- Laptop icon button (image filled in by load_icons) ---
+        self.laptop_btn = tk.Button(
+            self.root,
+            text="💻",
+            font=("Helvetica", 20),
+            borderwidth=0,
+            highlightthickness=0,
+            command=self.open_motioneye,
+            cursor="hand2",
+            bg="#f5f5f5",
+            activebackground="#e0e0e0"
+        )
+        self.laptop_btn.pack(pady=(0, 1), side="bottom")
 
         self.motioneye_url = "http://localhost:8765"
-        link_label = tk.Label(
+        self.motioneye = MotionEyeService(self.motioneye_url)
+        self.motioneye_pending = False
+        self.motioneye_link = link_label = tk.Label(
             self.root,
-            text="Click Here to Open the Motion Eye Local Web UI:\nlocalhost:8765",
+            text=self.MOTIONEYE_LINK_TEXT,
             fg="#1379ec",  # deep blue
             cursor="hand2",
             font=("Helvetica", 20, "bold", "underline"),
@@ -373,30 +2465,88 @@ class PTZCameraControl:
 
         print("[DEBUG] UI setup complete.")
 
+    def load_icons(self):
+        # PNG decoding is deferred until after the first paint.
+        icons_dir = os.path.join(os.path.dirname(__file__), "icons")
+        with STARTUP.phase("icons"):
+            try:
+                self.icon_img = tk.PhotoImage(file=os.path.join(icons_dir, "MotionEye-Blue-64x64-Icon.png"))
+                if hasattr(self.icon_img, "zoom"):
+                    self.icon_img = self.icon_img.zoom(2, 2)
+                self.icon_label.config(image=self.icon_img)
+            except Exception as e:
+                print(f"[DEBUG] Icon could not be loaded: {e}")
+
+            mpv_icon_path = os.path.join(icons_dir, "mpv-64x64-icon.png")
+            if os.path.exists(mpv_icon_path):
+                try:
+                    self.mpv_icon_img = tk.PhotoImage(file=mpv_icon_path)
+                    self.mpv_btn.config(image=self.mpv_icon_img, compound="left", text="  Start MPV Stream  ")
+                except Exception as e:
+                    print(f"[DEBUG] MPV icon could not be loaded: {e}")
+
+            try:
+                self.laptop_icon_img = tk.PhotoImage(
+                    file=os.path.join(icons_dir, "Laptop-Ip-Cam-WebPage-Icon-Scaled-64x64.png")
+                )
+                self.laptop_btn.config(image=self.laptop_icon_img, text="")
+            except Exception as e:
+                print(f"[DEBUG] Laptop icon could not be loaded: {e}")
+        self.startup_step_done("icons")
+
+    def on_initial_connect(self, ok):
+        self.call_in_ui(self.startup_step_done, "connect")
+
+    def startup_step_done(self, step):
+        self.startup_waiting.discard(step)
+        if self.startup_waiting:
+            return
+        STARTUP.report()
+        if self.quit_after_startup:
+            self.root.after(0, self.root.destroy)
+
+    def run_ptz(self, command, *args):
+        self.ptz_worker.submit(getattr(self, command), *args)
+
+    def on_close(self):
+        # Staged clips only live in RAM until flushed: stop recording so the
+        # final flush after mainloop catches everything.
+        if self.staging is not None:
+            self.stop_motion()
+        self.root.destroy()
+
     def update_video_summary(self):
-        vid_types = ("*.mp4", "*.mkv", "*.avi")
-        files = []
-        for vt in vid_types:
-            files.extend(glob.glob(os.path.join(self.save_dir, vt)))
-        num_files = len(files)
-        if num_files == 0:
-            summary = "No saved videos yet."
-        else:
-            times = [os.path.getmtime(f) for f in files]
-            sizes = [os.path.getsize(f) for f in files]
-            first_time = datetime.datetime.fromtimestamp(min(times)).strftime('%Y-%m-%d %H:%M')
-            last_time = datetime.datetime.fromtimestamp(max(times)).strftime('%Y-%m-%d %H:%M')
-            total_mb = sum(sizes) / (1024 * 1024)
-            summary = f"Count: {num_files} | Oldest: {first_time} | Newest: {last_time} | Size: {total_mb:.1f} MB"
-            if total_mb > 1024:
-                summary += f" ({total_mb/1024:.2f} GB)"
-        self.video_summary_label.config(text=summary)
+        # The index sync can take seconds on a cold start, so it runs on a
+        # worker; requests arriving meanwhile collapse into one more pass.
+        if self.summary_running:
+            self.summary_stale = True
+            return
+        self.summary_running = True
+        self.summary_stale = False
+
+        def worker():
+            try:
+                text = self.recordings_summary()
+            except Exception as e:
+                print(f"[DEBUG] Recordings summary failed: {e}")
+                text = "Recordings summary unavailable."
+            self.call_in_ui(self.on_video_summary, text)
+
+        threading.Thread(target=worker, name="summary", daemon=True).start()
+
+    def on_video_summary(self, text):
+        self.summary_running = False
+        self.video_summary_label.config(text=text)
+        if self.summary_stale:
+            self.update_video_summary()
 
     def play_videos(self):
-        vid_types = ("*.mp4", "*.mkv", "*.avi")
-        files = []
-        for vt in vid_types:
-            files.extend(glob.glob(os.path.join(self.save_dir, vt)))
+        # Listing syncs the index first; do that off the Tk thread.
+        threading.Thread(
+            target=lambda: self.call_in_ui(self.play_files, self.list_recordings()), name="play-all", daemon=True
+        ).start()
+
+    def play_files(self, files):
         if not files:
             messagebox.showinfo("No Videos Found", "No saved videos found in the directory.")
             return
@@ -405,119 +2555,825 @@ class PTZCameraControl:
         except Exception as e:
             messagebox.showerror("Error", f"Could not play videos: {e}")
 
-    def start_motion(self):
-        config_path = self.motion_conf_path
-        ip = self.config['ip']
-        user = self.config['username']
-        password = self.config['password']
-        rtsp_repl = f'rtsp://{user}:{password}@{ip}:554/Streaming/Channels/101'
-        print(f"[DEBUG] Using motion.conf file: {config_path}")
-        try:
-            with open(config_path) as f:
-                text = f.read()
-            text = re.sub(
-                r'rtsp://[^:@]+:[^@]+@[\d\.]+:554/Streaming/Channels/101',
-                rtsp_repl,
-                text
-            )
-            text = re.sub(
-                r'rtsp://[^:@]+:[^@]+@[\d\.]+:554',
-                f'rtsp://{user}:{password}@{ip}:554',
-                text
-            )
-            with open(config_path, "w") as f:
-                f.write(text)
-            self.motion_proc = subprocess.Popen(['motion', '-c', config_path])
-            print("[DEBUG] Motion started with updated config.")
-            self.update_status("Motion running", "blue")
+    def on_motion_state(self, running):
+        if running:
             self.motion_btn.config(state='disabled')
             self.stop_motion_btn.config(state='normal')
-            self.update_video_summary()
-        except Exception as e:
-            print(f"[DEBUG] Failed to start motion: {e}")
-            messagebox.showerror("Error", f"Failed to start motion: {e}")
+        else:
+            self.motion_btn.config(state='normal')
+            self.stop_motion_btn.config(state='disabled')
+        self.update_video_summary()
 
-    def stop_motion(self):
-        if self.motion_proc is not None:
-            print("[DEBUG] Stopping motion process...")
-            try:
-                self.motion_proc.terminate()
-                self.motion_proc.wait(timeout=5)
-                print("[DEBUG] Motion process terminated.")
-                self.update_status("Motion stopped", "orange")
-            except Exception as e:
-                print(f"[DEBUG] Error terminating motion: {e}")
-                messagebox.showerror("Error", f"Error stopping motion: {e}")
-            finally:
-                self.motion_proc = None
-                self.motion_btn.config(state='normal')
-                self.stop_motion_btn.config(state='disabled')
-            self.update_video_summary()
+    def supervise_tick(self):
+        self.supervise_children()
+        self.root.after(self.SUPERVISE_INTERVAL_MS, self.supervise_tick)
+
+    # --- Fleet health window ---
+    FLEET_REFRESH_MS = 30000
+    FLEET_COLUMNS = (
+        ("health", "Status", 80), ("onvif_tcp", "ONVIF TCP", 90), ("rtsp_tcp", "RTSP TCP", 90),
+        ("rtsp_options", "RTSP OPTIONS", 100), ("onvif_time", "ONVIF time", 90), ("skew", "Clock skew", 80),
+    )
+
+    def open_fleet_health(self):
+        if getattr(self, "fleet_win", None) is not None and self.fleet_win.winfo_exists():
+            self.fleet_win.lift()
+            return
+        self.fleet_win = tk.Toplevel(self.root)
+        self.fleet_win.title("Fleet Health")
+        self.fleet_results = {}
+        self.fleet_running = False
+        self.fleet_timer = None
+        columns = [c[0] for c in self.FLEET_COLUMNS]
+        self.fleet_tree = ttk.Treeview(self.fleet_win, columns=columns, height=15)
+        self.fleet_tree.heading("#0", text="Camera")
+        self.fleet_tree.column("#0", width=130)
+        for key, title, width in self.FLEET_COLUMNS:
+            self.fleet_tree.heading(key, text=title)
+            self.fleet_tree.column(key, width=width, anchor="center")
+        self.fleet_tree.pack(fill="both", expand=True, padx=6, pady=6)
+        bottom = tk.Frame(self.fleet_win)
+        bottom.pack(fill="x", padx=6, pady=(0, 6))
+        self.fleet_status = tk.Label(bottom, text="", font=("Helvetica", 9))
+        self.fleet_status.pack(side="left")
+        tk.Button(bottom, text="🔄 Refresh", command=self.refresh_fleet_health).pack(side="right")
+        self.refresh_fleet_health()
+
+    def refresh_fleet_health(self):
+        if self.fleet_running or not self.fleet_win.winfo_exists():
+            return
+        # A manual Refresh replaces the pending auto-refresh instead of adding another.
+        if self.fleet_timer is not None:
+            self.fleet_win.after_cancel(self.fleet_timer)
+            self.fleet_timer = None
+        cameras, _ = load_saved_logins()
+        if self.config['ip'] not in cameras:
+            cameras.append(self.config['ip'])
+        for ip in cameras:
+            self.fleet_results[ip] = {}
+            if not self.fleet_tree.exists(ip):
+                self.fleet_tree.insert("", "end", iid=ip, text=ip)
+            self.render_fleet_row(ip)
+        self.fleet_running = True
+        self.fleet_started = time.perf_counter()
+        self.fleet_status.config(text=f"Probing {len(cameras)} camera(s)…")
+
+        def worker():
+            run_fleet_probe(cameras, self.config,
+                            lambda ip, name, result: self.call_in_ui(self.on_fleet_result, ip, name, result))
+            self.call_in_ui(self.on_fleet_done, len(cameras))
+
+        threading.Thread(target=worker, name="fleet-probe", daemon=True).start()
+
+    def on_fleet_result(self, ip, name, result):
+        self.fleet_results.setdefault(ip, {})[name] = result
+        if self.fleet_win.winfo_exists():
+            self.render_fleet_row(ip)
+
+    def render_fleet_row(self, ip):
+        probes = self.fleet_results.get(ip, {})
+        values = [fleet_health(probes)]
+        for name in FLEET_PROBES:
+            result = probes.get(name)
+            if result is None:
+                values.append("…")
+            elif result["ok"]:
+                values.append(f"✅ {result['ms']:.0f} ms")
+            else:
+                values.append(f"❌ {result['error'][:20]}")
+        skew = probes.get("onvif_time", {}).get("skew_s")
+        values.append("" if skew is None else f"{skew:+.1f} s")
+        self.fleet_tree.item(ip, values=values)
+
+    def on_fleet_done(self, count):
+        self.fleet_running = False
+        if not self.fleet_win.winfo_exists():
+            return
+        elapsed = time.perf_counter() - self.fleet_started
+        up = sum(1 for probes in self.fleet_results.values() if fleet_health(probes) == "UP")
+        self.fleet_status.config(
+            text=f"{up}/{count} up · sweep took {elapsed:.1f}s · {datetime.datetime.now():%H:%M:%S}"
+        )
+        self.fleet_timer = self.fleet_win.after(self.FLEET_REFRESH_MS, self.refresh_fleet_health)
+
+    # --- Recordings browser ---
+    # A canvas that only draws the rows in view, so 50k clips cost the same as 50.
+    BROWSER_ROW_H = 100
+    BROWSER_THUMB_CACHE = 200
+    ALL_CAMERAS = "All cameras"
+
+    def open_recordings_browser(self):
+        if getattr(self, "browser_win", None) is not None and self.browser_win.winfo_exists():
+            self.browser_win.lift()
+            return
+        from collections import OrderedDict
+        if self.media_catalog is None:
+            self.media_catalog = MediaCatalog(self.clip_index)
+        self.browser_win = tk.Toplevel(self.root)
+        self.browser_win.title("Recordings")
+        self.browser_win.geometry("520x640")
+        self.browser_rows = []
+        self.browser_row_of = {}
+        self.browser_items = set()
+        self.browser_thumbs = OrderedDict()
+        self.browser_render_pending = False
+
+        top = tk.Frame(self.browser_win)
+        top.pack(fill="x", padx=6, pady=6)
+        self.browser_camera = tk.StringVar(value=self.ALL_CAMERAS)
+        self.browser_camera_box = ttk.Combobox(top, textvariable=self.browser_camera, state="readonly", width=16)
+        self.browser_camera_box.pack(side="left")
+        self.browser_camera_box.bind("<<ComboboxSelected>>", lambda e: self.reload_recordings_browser())
+        tk.Button(top, text="🔄 Refresh", command=self.reload_recordings_browser).pack(side="right")
+        self.browser_status = tk.Label(top, text="", font=("Helvetica", 9))
+        self.browser_status.pack(side="left", padx=8)
+
+        body = tk.Frame(self.browser_win)
+        body.pack(fill="both", expand=True, padx=6, pady=(0, 6))
+        scrollbar = tk.Scrollbar(body, orient="vertical")
+        scrollbar.pack(side="right", fill="y")
+        self.browser_canvas = tk.Canvas(body, bg="white", highlightthickness=0,
+                                        yscrollincrement=self.BROWSER_ROW_H // 4)
+        self.browser_canvas.pack(side="left", fill="both", expand=True)
+
+        def on_scroll(first, last):
+            scrollbar.set(first, last)
+            self.schedule_browser_render()
+
+        self.browser_canvas.config(yscrollcommand=on_scroll)
+        scrollbar.config(command=self.browser_canvas.yview)
+        self.browser_canvas.bind("<Configure>", self.on_browser_resize)
+        self.browser_canvas.bind("<MouseWheel>", lambda e: self.browser_canvas.yview_scroll(-e.delta // 30, "units"))
+        self.browser_canvas.bind("<Button-4>", lambda e: self.browser_canvas.yview_scroll(-4, "units"))
+        self.browser_canvas.bind("<Button-5>", lambda e: self.browser_canvas.yview_scroll(4, "units"))
+        self.browser_canvas.bind("<Double-Button-1>", self.on_browser_double_click)
+        self.browser_win.protocol("WM_DELETE_WINDOW", self.close_recordings_browser)
+        self.reload_recordings_browser()
+        threading.Thread(target=self.media_catalog.prune, name="thumb-prune", daemon=True).start()
+
+    def close_recordings_browser(self):
+        self.media_catalog.cancel_except(())
+        self.browser_thumbs.clear()
+        self.browser_win.destroy()
+
+    def reload_recordings_browser(self):
+        camera = self.browser_camera.get()
+        camera = None if camera == self.ALL_CAMERAS else ("" if camera == "default" else camera)
+        self.browser_status.config(text="Loading…")
+
+        def worker():
+            self.clip_index.sync()
+            rows = self.clip_index.listing(camera)
+            cameras = sorted(c or "default" for c in self.clip_index.totals())
+            self.call_in_ui(self.on_browser_listing, rows, cameras)
+
+        threading.Thread(target=worker, name="browser-load", daemon=True).start()
+
+    def on_browser_listing(self, rows, cameras):
+        if not self.browser_win.winfo_exists():
+            return
+        self.browser_camera_box.config(values=[self.ALL_CAMERAS] + cameras)
+        self.browser_rows = rows
+        self.browser_row_of = {row[0]: i for i, row in enumerate(rows)}
+        total = sum(row[3] for row in rows)
+        self.browser_status.config(text=f"{len(rows)} clip(s) · {total / 1024**3:.2f} GB")
+        self.browser_canvas.delete("all")
+        self.browser_items.clear()
+        self.browser_canvas.config(scrollregion=(0, 0, 0, len(rows) * self.BROWSER_ROW_H))
+        self.browser_canvas.yview_moveto(0)
+        self.schedule_browser_render()
+
+    def on_browser_resize(self, event):
+        # Row backgrounds span the canvas width, so redraw the visible rows.
+        self.browser_canvas.delete("all")
+        self.browser_items.clear()
+        self.schedule_browser_render()
+
+    def schedule_browser_render(self):
+        # Coalesce bursts of scroll/resize events into one redraw.
+        if not self.browser_render_pending:
+            self.browser_render_pending = True
+            self.browser_win.after_idle(self.render_browser)
+
+    def render_browser(self):
+        self.browser_render_pending = False
+        if not self.browser_win.winfo_exists():
+            return
+        canvas = self.browser_canvas
+        top = canvas.canvasy(0)
+        first = max(0, int(top // self.BROWSER_ROW_H))
+        last = min(len(self.browser_rows), int((top + canvas.winfo_height()) // self.BROWSER_ROW_H) + 1)
+        visible = set(range(first, last))
+        for row in self.browser_items - visible:
+            canvas.delete(f"row{row}")
+        for row in sorted(visible - self.browser_items):
+            self.draw_browser_row(row)
+        self.browser_items = visible
+        self.media_catalog.cancel_except({self.browser_rows[row][0] for row in visible})
+
+    def browser_thumb(self, rel, mtime):
+        image = self.browser_thumbs.get(rel)
+        if image is not None:
+            self.browser_thumbs.move_to_end(rel)
+            return image
+        path = self.media_catalog.thumb_path(rel, mtime)
+        if not os.path.exists(path):
+            return None
+        try:
+            image = tk.PhotoImage(file=path)
+        except tk.TclError:
+            return None
+        self.browser_thumbs[rel] = image
+        if len(self.browser_thumbs) > self.BROWSER_THUMB_CACHE:
+            self.browser_thumbs.popitem(last=False)
+        return image
+
+    def draw_browser_row(self, row):
+        rel, camera, mtime, size = self.browser_rows[row]
+        canvas, tag = self.browser_canvas, f"row{row}"
+        y = row * self.BROWSER_ROW_H
+        width = canvas.winfo_width()
+        canvas.create_rectangle(0, y, width, y + self.BROWSER_ROW_H, fill="#f4f7fb" if row % 2 else "white",
+                                outline="", tags=tag)
+        meta = self.media_catalog.cached(rel, mtime)
+        thumb = self.browser_thumb(rel, mtime) if meta is not None else None
+        if thumb is not None:
+            canvas.create_image(8, y + self.BROWSER_ROW_H // 2, image=thumb, anchor="w", tags=tag)
+        else:
+            canvas.create_rectangle(8, y + 5, 8 + MediaCatalog.THUMB_WIDTH, y + 95, fill="#ddd", outline="", tags=tag)
+        if meta is None:
+            self.media_catalog.request(
+                rel, mtime, lambda r: self.call_in_ui(self.on_browser_media, r)
+            )
+            details = "probing…" if self.media_catalog.have_ffmpeg else "ffprobe not installed"
         else:
-            print("[DEBUG] No running motion process.")
+            duration, codec, w, h = meta
+            length = f"{int(duration // 60)}:{int(duration % 60):02d}" if duration else "?"
+            details = f"{length} · {codec or '?'} {w or '?'}x{h or '?'}"
+        x = 16 + MediaCatalog.THUMB_WIDTH
+        stamp = datetime.datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S')
+        canvas.create_text(x, y + 18, anchor="w", text=f"{stamp} · {camera or 'default'}",
+                           font=("Helvetica", 10, "bold"), tags=tag)
+        canvas.create_text(x, y + 42, anchor="w", text=f"{details} · {size / 2**20:.1f} MB",
+                           font=("Helvetica", 9), tags=tag)
+        canvas.create_text(x, y + 64, anchor="w", text=os.path.basename(rel), fill="#777",
+                           font=("Helvetica", 8), tags=tag)
 
-    def move(self, x, y):
+    def on_browser_media(self, rel):
+        row = self.browser_row_of.get(rel)
+        if row is None or row not in self.browser_items or not self.browser_win.winfo_exists():
+            return
+        self.browser_canvas.delete(f"row{row}")
+        self.draw_browser_row(row)
+
+    def on_browser_double_click(self, event):
+        row = int(self.browser_canvas.canvasy(event.y) // self.BROWSER_ROW_H)
+        if 0 <= row < len(self.browser_rows):
+            self.play_clip(self.clip_index.full_path(self.browser_rows[row][0]))
+
+    def play_clip(self, path):
         try:
-            if not self.ptz or not self.token:
-                self.update_status("PTZ not connected", "red")
-                messagebox.showerror("Movement Error", "PTZ service not connected.")
-                return
-            print(f"[DEBUG] Moving: x={x}, y={y}")
-            self.ptz.ContinuousMove({
-                'ProfileToken': self.token,
-                'Velocity': {'PanTilt': {'x': x, 'y': y}}
-            })
+            subprocess.Popen(["mpv", path])
         except Exception as e:
-            self.update_status("Movement Error", "red")
-            messagebox.showerror("Error", f"Movement failed: {str(e)}")
+            messagebox.showerror("Error", f"Could not play video: {e}")
 
-    def go_to_center(self):
+    # --- Motion event timeline ---
+    TIMELINE_RANGES = (("Last 24 hours", 1), ("Last 7 days", 7), ("Last 30 days", 30), ("Last 90 days", 90))
+    TIMELINE_LANE_H = 56
+    TIMELINE_LEFT = 110
+    TIMELINE_BUCKET_PX = 4
+
+    def on_recording_event(self, kind, clip):
+        self.call_in_ui(self.on_recording_event_ui, kind)
+
+    def on_recording_event_ui(self, kind):
+        if kind == "movie_end":
+            self.update_video_summary()
+        if getattr(self, "timeline_win", None) is not None and self.timeline_win.winfo_exists():
+            self.draw_timeline()
+
+    def open_timeline(self):
+        if getattr(self, "timeline_win", None) is not None and self.timeline_win.winfo_exists():
+            self.timeline_win.lift()
+            return
+        if self.events is None:
+            self.events = EventStore(self.clip_index)
+        self.timeline_win = tk.Toplevel(self.root)
+        self.timeline_win.title("Motion Timeline")
+        self.timeline_win.geometry("720x300")
+        top = tk.Frame(self.timeline_win)
+        top.pack(fill="x", padx=6, pady=6)
+        self.timeline_range = tk.StringVar(value=self.TIMELINE_RANGES[0][0])
+        box = ttk.Combobox(top, textvariable=self.timeline_range, state="readonly", width=14,
+                           values=[r[0] for r in self.TIMELINE_RANGES])
+        box.pack(side="left")
+        box.bind("<<ComboboxSelected>>", lambda e: self.draw_timeline())
+        self.timeline_status = tk.Label(top, text="", font=("Helvetica", 9))
+        self.timeline_status.pack(side="left", padx=8)
+        self.timeline_canvas = tk.Canvas(self.timeline_win, bg="white", highlightthickness=0)
+        self.timeline_canvas.pack(fill="both", expand=True, padx=6, pady=(0, 6))
+        self.timeline_canvas.bind("<Configure>", lambda e: self.draw_timeline())
+        self.timeline_canvas.bind("<Button-1>", self.on_timeline_click)
+
+    def timeline_span(self):
+        days = dict(self.TIMELINE_RANGES)[self.timeline_range.get()]
+        end_ms = int(time.time() * 1000)
+        return end_ms - days * 86400 * 1000, end_ms
+
+    def draw_timeline(self):
+        canvas = self.timeline_canvas
+        canvas.delete("all")
+        width = canvas.winfo_width()
+        plot_w = max(10, width - self.TIMELINE_LEFT - 10)
+        buckets = max(1, plot_w // self.TIMELINE_BUCKET_PX)
+        start_ms, end_ms = self.timeline_span()
+        started = time.perf_counter()
+        density = self.events.density(start_ms, end_ms, buckets)
+        query_ms = (time.perf_counter() - started) * 1000
+        self.timeline_cameras = sorted(density)
+        if not density:
+            canvas.create_text(width // 2, 60, text="No motion events yet.\nHooks are added to motion.conf when recording starts.",
+                               justify="center", fill="#777")
+        peak = max((max(c) for c in density.values()), default=0) or 1
+        bar_w = plot_w / buckets
+        for lane, camera in enumerate(self.timeline_cameras):
+            y0 = 10 + lane * self.TIMELINE_LANE_H
+            y1 = y0 + self.TIMELINE_LANE_H - 10
+            canvas.create_text(6, (y0 + y1) // 2, anchor="w", text=camera, font=("Helvetica", 9, "bold"))
+            canvas.create_line(self.TIMELINE_LEFT, y1, self.TIMELINE_LEFT + plot_w, y1, fill="#bbb")
+            for i, count in enumerate(density[camera]):
+                if count:
+                    x = self.TIMELINE_LEFT + i * bar_w
+                    h = max(2, (y1 - y0) * count / peak)
+                    canvas.create_rectangle(x, y1 - h, x + max(1, bar_w - 1), y1, fill="#1379ec", outline="")
+        axis_y = 10 + max(1, len(self.timeline_cameras)) * self.TIMELINE_LANE_H
+        fmt = '%H:%M' if end_ms - start_ms <= 86400 * 1000 else '%m-%d'
+        for i in range(5):
+            x = self.TIMELINE_LEFT + plot_w * i / 4
+            stamp = datetime.datetime.fromtimestamp((start_ms + (end_ms - start_ms) * i / 4) / 1000).strftime(fmt)
+            canvas.create_text(x, axis_y, anchor="n", text=stamp, font=("Helvetica", 8), fill="#555")
+        total = sum(sum(c) for c in density.values())
+        self.timeline_status.config(text=f"{total} event(s) · query {query_ms:.1f} ms · click a bar to play")
+
+    def on_timeline_click(self, event):
+        lane = (event.y - 10) // self.TIMELINE_LANE_H
+        plot_w = max(10, self.timeline_canvas.winfo_width() - self.TIMELINE_LEFT - 10)
+        if not (0 <= lane < len(self.timeline_cameras)) or not (0 <= event.x - self.TIMELINE_LEFT <= plot_w):
+            return
+        start_ms, end_ms = self.timeline_span()
+        # Snap back to the start of the clicked bar so the first clip in it is found.
+        bar_ms = (end_ms - start_ms) * self.TIMELINE_BUCKET_PX / plot_w
+        ts_ms = start_ms + (end_ms - start_ms) * (event.x - self.TIMELINE_LEFT) / plot_w
+        ts_ms -= (ts_ms - start_ms) % bar_ms
+        clip = self.events.clip_at(self.timeline_cameras[lane], int(ts_ms))
+        if clip is None:
+            self.timeline_status.config(text="No recording after that point.")
+            return
+        self.timeline_status.config(text=f"Playing {clip}")
+        self.play_clip(self.clip_path(clip))
+
+    # --- Export window ---
+    def open_export(self):
+        if getattr(self, "export_win", None) is not None and self.export_win.winfo_exists():
+            self.export_win.lift()
+            return
+        self.export_win = tk.Toplevel(self.root)
+        self.export_win.title("Export Recordings")
+        self.export_job = None
+        form = tk.Frame(self.export_win)
+        form.pack(padx=10, pady=10)
+        cameras = sorted(c or "default" for c in self.clip_index.totals()) or ["default"]
+        now = datetime.datetime.now().replace(second=0, microsecond=0)
+        self.export_camera = tk.StringVar(value=cameras[0])
+        self.export_start = tk.StringVar(value=(now - datetime.timedelta(hours=1)).strftime('%Y-%m-%d %H:%M'))
+        self.export_end = tk.StringVar(value=now.strftime('%Y-%m-%d %H:%M'))
+        tk.Label(form, text="Camera").grid(row=0, column=0, sticky="w")
+        ttk.Combobox(form, textvariable=self.export_camera, values=cameras, state="readonly", width=20).grid(row=0, column=1, pady=2)
+        tk.Label(form, text="From").grid(row=1, column=0, sticky="w")
+        tk.Entry(form, textvariable=self.export_start, width=22).grid(row=1, column=1, pady=2)
+        tk.Label(form, text="To").grid(row=2, column=0, sticky="w")
+        tk.Entry(form, textvariable=self.export_end, width=22).grid(row=2, column=1, pady=2)
+        self.export_progress = ttk.Progressbar(self.export_win, length=280, maximum=1.0)
+        self.export_progress.pack(padx=10)
+        self.export_status = tk.Label(self.export_win, text=f"Saves to {EXPORT_DIR}", font=("Helvetica", 9),
+                                      wraplength=300)
+        self.export_status.pack(padx=10, pady=4)
+        self.export_btn = tk.Button(self.export_win, text="📤 Export (lossless)", font=("Helvetica", 10, "bold"),
+                                    command=self.start_export)
+        self.export_btn.pack(pady=(0, 10))
+
+    def start_export(self):
         try:
-            print("[DEBUG] Going to center preset (x=0, y=0)")
-            self.ptz.AbsoluteMove({
-                'ProfileToken': self.token,
-                'Position': {'PanTilt': {'x': 0, 'y': 0}}
-            })
-            self.update_status(
-                "🟢 Streaming RTSP via MPV\n"
-                "🎮 Actively controlling movement through:\n"
-                "   ONVIF PTZ (Pan-Tilt-Zoom) API\n"
-                "🌐 Web UI via MotionEye Local Server\n",
-                "#13ad39"
-            )
-        except Exception as e:
-            self.update_status("Connection Error", "red")
-            messagebox.showerror("Error", f"Connecting failed: {str(e)}")
+            start = datetime.datetime.fromisoformat(self.export_start.get().strip()).timestamp()
+            end = datetime.datetime.fromisoformat(self.export_end.get().strip()).timestamp()
+        except ValueError:
+            self.export_status.config(text="Times must look like 2026-01-31 14:00", fg="red")
+            return
+        if end <= start:
+            self.export_status.config(text="'To' must be after 'From'", fg="red")
+            return
+        camera = self.export_camera.get()
+        camera = "" if camera == "default" else camera
+        self.export_btn.config(state="disabled")
+        self.export_status.config(text="Finding clips…", fg="black")
+        self.export_job = ExportJob(self.clip_index, camera, start, end, export_path(camera, start, end),
+                                    lambda job: self.call_in_ui(self.on_export_update, job)).start()
 
-    def open_motioneye(self, quiet=False):
+    def on_export_update(self, job):
+        if not self.export_win.winfo_exists():
+            return
+        self.export_progress.config(value=job.progress)
+        if job.state == "running":
+            self.export_status.config(text=f"Exporting {job.clips or '…'} clip(s): {job.progress * 100:.0f}%", fg="black")
+        elif job.state == "done":
+            self.export_status.config(text=f"Saved {job.out_path}", fg="green")
+            self.export_btn.config(state="normal")
+        elif job.state == "failed":
+            self.export_status.config(text=f"Export failed: {job.error}", fg="red")
+            self.export_btn.config(state="normal")
+
+    def call_in_ui(self, fn, *args):
+        if threading.current_thread() is threading.main_thread():
+            fn(*args)
+        else:
+            self.ui_queue.put((fn, args))
+
+    def drain_ui_queue(self):
         try:
-            out = subprocess.run(
-                ["systemctl", "is-active", "motioneye.service"],
-                capture_output=True, text=True
+            while True:
+                try:
+                    fn, args = self.ui_queue.get_nowait()
+                except queue.Empty:
+                    break
+                # One failing callback must not stop the loop for the rest of the session.
+                try:
+                    fn(*args)
+                except Exception as e:
+                    print(f"[DEBUG] UI callback {getattr(fn, '__name__', fn)} failed: {e}")
+        finally:
+            self.root.after(self.UI_QUEUE_INTERVAL_MS, self.drain_ui_queue)
+
+    # --- motionEye ---
+    MOTIONEYE_LINK_TEXT = "Click Here to Open the Motion Eye Local Web UI:\nlocalhost:8765"
+
+    def open_motioneye(self, quiet=False):
+        # Service check + start happen on a worker; the browser opens once the UI answers.
+        if self.motioneye_pending:
+            return
+        self.motioneye_pending = True
+        self.motioneye_link.config(text="Starting motionEye…\nlocalhost:8765")
+
+        def worker():
+            try:
+                self.motioneye.ensure_running()
+                error = None
+            except Exception as e:
+                error = str(e)
+            self.call_in_ui(self.on_motioneye_ready, error, quiet)
+
+        threading.Thread(target=worker, name="motioneye", daemon=True).start()
+
+    def on_motioneye_ready(self, error, quiet):
+        self.motioneye_pending = False
+        self.motioneye_link.config(text=self.MOTIONEYE_LINK_TEXT)
+        if error is None:
+            threading.Thread(target=webbrowser.open, args=(self.motioneye_url,), name="browser", daemon=True).start()
+            return
+        print(f"[DEBUG] motionEye not available: {error}")
+        if not quiet:
+            messagebox.showwarning(
+                "motionEye not running",
+                f"motionEye could not be started automatically ({error}). Please run:\n\nsudo systemctl start motioneye.service\n\nThen click the link again."
             )
-            if "inactive" in out.stdout or "failed" in out.stdout or out.returncode != 0:
-                subprocess.run(["systemctl", "start", "motioneye.service"])
-                import time; time.sleep(1)
-                out = subprocess.run(
-                    ["systemctl", "is-active", "motioneye.service"],
-                    capture_output=True, text=True
-                )
-                if "active" not in out.stdout:
-                    if not quiet:
-                        messagebox.showwarning(
-                            "motionEye not running",
-                            "motionEye could not be started automatically. Please run:\n\nsudo systemctl start motioneye.service\n\nThen click the link again."
-                        )
-                    return
-            webbrowser.open(self.motioneye_url)
-        except Exception as e:
-            if not quiet:
-                messagebox.showerror("motionEye", f"Could not check or start motionEye:\n{e}")
+
+    def show_error(self, title, message):
+        self.last_error = f"{title}: {message}"
+        self.call_in_ui(messagebox.showerror, title, message)
+
+    def show_warning(self, title, message):
+        self.call_in_ui(messagebox.showwarning, title, message)
 
     def update_status(self, text, color):
+        self.call_in_ui(self.set_status_label, text, color)
+
+    def set_status_label(self, text, color):
         if self.status_label:
             self.status_label.config(text=text, fg=color)
 
+
+# --- Headless daemon + local control API ---
+
+class MetricsMixin:
+    # Request handling for the metrics endpoint; mixed into http.server's
+    # BaseHTTPRequestHandler by make_api_server so the GUI never imports it
+    # unless asked to.
+    # GET  /metrics                -> Prometheus text format
+    # GET  /metrics.json           -> JSON dump of the same series
+
+    def address_string(self):
+        # Unix-socket clients have no (host, port) tuple.
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return "unix"
+
+    def log_message(self, format, *args):
+        print(f"[DEBUG] API {self.address_string()} {format % args}")
+
+    def send_json(self, code, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/metrics":
+            self.server.cam.collect_process_metrics()
+            body = METRICS.render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif path == "/metrics.json":
+            self.server.cam.collect_process_metrics()
+            self.send_json(200, METRICS.as_dict())
+        else:
+            self.send_json(404, {"error": f"unknown endpoint {path}"})
+
+    def log_request(self, code="-", size="-"):
+        # Prometheus scrapes every few seconds; keep them out of the debug log.
+        if not self.path.startswith("/metrics"):
+            super().log_request(code, size)
+
+
+class CamApiMixin(MetricsMixin):
+    # Control API for --headless, on top of the metrics endpoints.
+    # GET  /status                 -> JSON status
+    # GET  /fleet                  -> probe every saved camera
+    # GET  /events?start=&end=&camera=  -> motion events, times in epoch ms
+    # POST /ptz/move {"x":, "y":}  -> ContinuousMove (202 {"queued": true} while offline, buffer policy)
+    # POST /ptz/stop, /ptz/center
+    # POST /recording/start, /recording/stop
+    # POST /snapshot               -> {"path": ...}
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/status":
+            self.send_json(200, self.server.cam.status())
+        elif path == "/fleet":
+            cameras, _ = load_saved_logins()
+            self.send_json(200, run_fleet_probe(cameras, self.server.cam.config))
+        elif path == "/events":
+            query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+            now_ms = int(time.time() * 1000)
+            try:
+                start = int(query.get("start", now_ms - 86400 * 1000))
+                end = int(query.get("end", now_ms))
+            except ValueError:
+                self.send_json(400, {"error": "start/end must be epoch milliseconds"})
+                return
+            cam = self.server.cam
+            store = cam.events or EventStore(cam.clip_index)
+            self.send_json(200, store.between(start, end, query.get("camera")))
+        else:
+            super().do_GET()
+
+    def do_POST(self):
+        cam = self.server.cam
+        path = urlparse(self.path).path
+        try:
+            body = self.read_json()
+        except ValueError as e:
+            self.send_json(400, {"error": f"bad JSON body: {e}"})
+            return
+        try:
+            if path == "/ptz/move":
+                x = max(-1.0, min(1.0, float(body.get("x", 0))))
+                y = max(-1.0, min(1.0, float(body.get("y", 0))))
+                ok = cam.move(x, y)
+            elif path == "/ptz/stop":
+                ok = cam.stop_ptz()
+            elif path == "/ptz/center":
+                ok = cam.go_to_center()
+            elif path == "/recording/start":
+                ok = cam.motion_proc is not None or cam.start_motion()
+            elif path == "/recording/stop":
+                ok = cam.stop_motion()
+            elif path == "/snapshot":
+                self.send_json(200, {"ok": True, "path": cam.take_snapshot()})
+                return
+            else:
+                self.send_json(404, {"error": f"unknown endpoint {path}"})
+                return
+        except Exception as e:
+            self.send_json(500, {"ok": False, "error": str(e)})
+            return
+        if ok == cam.PTZ_QUEUED:
+            self.send_json(202, {"ok": True, "queued": True})
+            return
+        self.send_json(200 if ok else 409, {"ok": bool(ok), "error": cam.last_error if not ok else None})
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_api_server(cam, addr, mixin=CamApiMixin):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    handler = type(mixin.__name__.replace("Mixin", "Handler"), (mixin, BaseHTTPRequestHandler), {})
+    if addr.startswith("unix:"):
+        sock_path = addr[len("unix:"):]
+        if os.path.exists(sock_path):
+            os.unlink(sock_path)
+        server = UnixHTTPServer(sock_path, handler)
+        os.chmod(sock_path, 0o660)
+    else:
+        host, _, port = addr.rpartition(":")
+        server = ThreadingHTTPServer((host or "127.0.0.1", int(port)), handler)
+        server.daemon_threads = True
+    server.cam = cam
+    return server
+
+
+class CamCommanderDaemon(CamCommanderCore):
+    SUPERVISE_INTERVAL = 2
+
+    def __init__(self, cli_ip=None, api_addr=DEFAULT_API_ADDR, quit_after_startup=False, metrics_addr=None):
+        print("[DEBUG] Starting CamCommanderDaemon (headless)...")
+        with STARTUP.phase("credential_load"):
+            previous_ips, creds = load_saved_logins()
+        ip = cli_ip or (previous_ips[-1] if previous_ips else None)
+        if not ip:
+            print("[DEBUG] No camera IP given and none saved in ~/.ptz_ips.json. Exiting.")
+            sys.exit(1)
+        remember_ip(ip, previous_ips)
+        super().__init__(
+            ip,
+            creds.get(ip, {}).get("username", ""),
+            creds.get(ip, {}).get("password", "")
+        )
+        self.api_addr = api_addr
+        self.metrics_addr = metrics_addr
+        self.quit_after_startup = quit_after_startup
+        self.status_text = "Disconnected"
+        self.stop_event = threading.Event()
+
+    def update_status(self, text, color):
+        self.status_text = text.strip()
+        super().update_status(text, color)
+
+    def status(self):
+        status = super().status()
+        status['status'] = self.status_text
+        status['last_error'] = self.last_error
+        return status
+
+    def request_stop(self, signum=None, frame=None):
+        print(f"[DEBUG] Received signal {signum}, shutting down...")
+        self.stop_event.set()
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        self.connect_camera()
+        self.start_keepalive()
+        self.start_staging()
+        self.start_event_listener()
+        self.start_retention()
+
+        with STARTUP.phase("api_ready"):
+            server = make_api_server(self, self.api_addr)
+            threading.Thread(target=server.serve_forever, name="api", daemon=True).start()
+        print(f"[DEBUG] Control API listening on {self.api_addr} (metrics at /metrics)")
+        metrics_server = self.serve_metrics(self.metrics_addr) if self.metrics_addr else None
+        STARTUP.report()
+        if self.quit_after_startup:
+            self.stop_event.set()
+        try:
+            while not self.stop_event.wait(self.SUPERVISE_INTERVAL):
+                self.supervise_children()
+        finally:
+            for srv in (server, metrics_server):
+                if srv is not None:
+                    srv.shutdown()
+                    srv.server_close()
+            if self.api_addr.startswith("unix:"):
+                try:
+                    os.unlink(self.api_addr[len("unix:"):])
+                except OSError:
+                    pass
+            self.stop_keepalive()
+            self.stop_motion()
+            self.stop_event_listener()
+            self.stop_staging()
+            self.stop_retention()
+            print("[DEBUG] Daemon stopped.")
+
+
+def fleet_cli():
+    cameras, _ = load_saved_logins()
+    if not cameras:
+        print("No saved cameras in ~/.ptz_ips.json.")
+        return 1
+    config = {}
+    if CONFIG_PATH.exists():
+        with open(CONFIG_PATH) as f:
+            config = json.load(f)
+    start = time.perf_counter()
+
+    def show(ip, name, result):
+        detail = f"{result['ms']:.0f} ms" if result["ok"] else result["error"]
+        if "skew_s" in result:
+            detail += f", clock skew {result['skew_s']:+.1f} s"
+        print(f"{ip:<18} {name:<14} {'OK' if result['ok'] else 'FAIL':<5} {detail}", flush=True)
+
+    results = run_fleet_probe(cameras, config, show)
+    verdicts = {ip: fleet_health(probes) for ip, probes in results.items()}
+    up = sum(1 for v in verdicts.values() if v == "UP")
+    print(f"\n{up}/{len(cameras)} cameras up, sweep took {time.perf_counter() - start:.1f}s")
+    for ip, verdict in verdicts.items():
+        if verdict != "UP":
+            print(f"  {ip}: {verdict}")
+    return 0 if up == len(cameras) else 2
+
+
+def export_cli(args):
+    try:
+        start, end = (datetime.datetime.fromisoformat(t.strip()).timestamp() for t in args.export)
+    except ValueError:
+        print('Export times must look like "2026-01-31 14:00".')
+        return 1
+    if end <= start:
+        print("Export end must be after its start.")
+        return 1
+    camera = "" if args.camera == "default" else args.camera
+    index = ClipIndex(os.path.expanduser(SAVE_DIR))
+    index.sync()
+    out_path = args.out or export_path(camera, start, end)
+
+    def show(job):
+        if job.state == "running":
+            print(f"\rExporting {job.clips or '…'} clip(s): {job.progress * 100:5.1f}%", end="", flush=True)
+
+    job = ExportJob(index, camera, start, end, out_path, show)
+    job.run()
+    print()
+    if job.state != "done":
+        print(f"Export failed: {job.error}")
+        return 1
+    print(f"Saved {out_path}")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="CamCommander PTZ & NVR GUI")
+    parser.add_argument("ip", nargs="?", help="camera IP (skips the login dialog)")
+    parser.add_argument("--headless", action="store_true",
+                        help="run without Tk, controlled through the local API")
+    parser.add_argument("--api", default=DEFAULT_API_ADDR, metavar="HOST:PORT|unix:PATH",
+                        help=f"control API address for --headless (default {DEFAULT_API_ADDR})")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print a per-phase startup timing breakdown")
+    parser.add_argument("--quit-after-startup", action="store_true",
+                        help="exit as soon as startup finishes (used by bench/startup_bench.py)")
+    parser.add_argument("--metrics", metavar="HOST:PORT",
+                        help="serve Prometheus metrics on HOST:PORT (/metrics and /metrics.json)")
+    parser.add_argument("--metrics-dump", metavar="PATH",
+                        help="write the metrics as JSON to PATH on exit")
+    parser.add_argument("--fleet", action="store_true",
+                        help="probe every saved camera (ONVIF/RTSP reachability, latency, clock skew) and exit")
+    parser.add_argument("--export", nargs=2, metavar=("START", "END"),
+                        help='losslessly export recordings between two times ("2026-01-31 14:00") and exit')
+    parser.add_argument("--camera", default="default",
+                        help="camera folder for --export (default: clips at the top of the recordings folder)")
+    parser.add_argument("--out", metavar="PATH", help=f"output file for --export (default under {EXPORT_DIR})")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    print("[DEBUG] Launching PTZCameraControl application...")
-    PTZCameraControl()
+    args = parse_args()
+    STARTUP.enabled = args.profile_startup
+    if args.fleet:
+        sys.exit(fleet_cli())
+    if args.export:
+        sys.exit(export_cli(args))
+    try:
+        if args.headless:
+            CamCommanderDaemon(args.ip, args.api, args.quit_after_startup, args.metrics).run()
+        else:
+            print("[DEBUG] Launching PTZCameraControl application...")
+            PTZCameraControl(args.ip, args.quit_after_startup, args.metrics)
+    finally:
+        if args.metrics_dump:
+            with open(args.metrics_dump, "w") as f:
+                json.dump(METRICS.as_dict(), f, indent=2)
+            print(f"[DEBUG] Metrics written to {args.metrics_dump}")
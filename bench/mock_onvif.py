@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# Minimal mock ONVIF device for benchmarks and offline testing.
+#
+# Answers just enough of the Device, Media and PTZ services for
+# CamCommander (and onvif-zeep's ONVIFCamera) to connect, read profiles,
+# move the camera and take the time. Every reply is delayed by
+# --latency-ms +/- --jitter-ms to imitate a slow camera or Wi-Fi link.
+# Authentication headers are accepted and ignored.
+#
+#   python3 bench/mock_onvif.py --port 8899 --latency-ms 30 --jitter-ms 15
+
+import argparse
+import datetime
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SOAP_ENV = "http://www.w3.org/2003/05/soap-envelope"
+NAMESPACES = {
+    "tds": "http://www.onvif.org/ver10/device/wsdl",
+    "trt": "http://www.onvif.org/ver10/media/wsdl",
+    "tptz": "http://www.onvif.org/ver20/ptz/wsdl",
+    "tt": "http://www.onvif.org/ver10/schema",
+}
+OP_RE = re.compile(rb"<(?:[\w-]+:)?Body[^>]*>\s*<(?:[\w-]+:)?(\w+)")
+
+
+def envelope(body):
+    ns = " ".join(f'xmlns:{k}="{v}"' for k, v in NAMESPACES.items())
+    return (f'<?xml version="1.0" encoding="UTF-8"?>'
+            f'<s:Envelope xmlns:s="{SOAP_ENV}" {ns}><s:Body>{body}</s:Body></s:Envelope>').encode()
+
+
+def fault(reason):
+    return envelope(
+        "<s:Fault><s:Code><s:Value>s:Sender</s:Value></s:Code>"
+        f"<s:Reason><s:Text xml:lang=\"en\">{reason}</s:Text></s:Reason></s:Fault>"
+    )
+
+
+class MockOnvifHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, Nagle plus
+    # delayed ACK adds ~40 ms to every keep-alive request.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def base_url(self):
+        host = self.headers.get("Host") or f"{self.server.server_address[0]}:{self.server.server_address[1]}"
+        return f"http://{host}"
+
+    def reply_for(self, op):
+        base = self.base_url()
+        if op == "GetCapabilities":
+            return envelope(
+                "<tds:GetCapabilitiesResponse><tds:Capabilities>"
+                f"<tt:Device><tt:XAddr>{base}/onvif/device_service</tt:XAddr></tt:Device>"
+                f"<tt:Media><tt:XAddr>{base}/onvif/media_service</tt:XAddr>"
+                "<tt:StreamingCapabilities><tt:RTPMulticast>false</tt:RTPMulticast>"
+                "<tt:RTP_TCP>true</tt:RTP_TCP><tt:RTP_RTSP_TCP>true</tt:RTP_RTSP_TCP>"
+                "</tt:StreamingCapabilities></tt:Media>"
+                f"<tt:PTZ><tt:XAddr>{base}/onvif/ptz_service</tt:XAddr></tt:PTZ>"
+                "</tds:Capabilities></tds:GetCapabilitiesResponse>"
+            )
+        if op == "GetSystemDateAndTime":
+            now = datetime.datetime.utcnow() + datetime.timedelta(seconds=self.server.clock_skew)
+            return envelope(
+                "<tds:GetSystemDateAndTimeResponse><tds:SystemDateAndTime>"
+                "<tt:DateTimeType>NTP</tt:DateTimeType><tt:DaylightSavings>false</tt:DaylightSavings>"
+                "<tt:TimeZone><tt:TZ>UTC0</tt:TZ></tt:TimeZone><tt:UTCDateTime>"
+                f"<tt:Time><tt:Hour>{now.hour}</tt:Hour><tt:Minute>{now.minute}</tt:Minute><tt:Second>{now.second}</tt:Second></tt:Time>"
+                f"<tt:Date><tt:Year>{now.year}</tt:Year><tt:Month>{now.month}</tt:Month><tt:Day>{now.day}</tt:Day></tt:Date>"
+                "</tt:UTCDateTime></tds:SystemDateAndTime></tds:GetSystemDateAndTimeResponse>"
+            )
+        if op == "GetProfiles":
+            return envelope(
+                '<trt:GetProfilesResponse><trt:Profiles token="Profile_1" fixed="true">'
+                "<tt:Name>mainStream</tt:Name></trt:Profiles></trt:GetProfilesResponse>"
+            )
+        if op == "GetSnapshotUri":
+            return envelope(
+                "<trt:GetSnapshotUriResponse><trt:MediaUri>"
+                f"<tt:Uri>{base}/snapshot.jpg</tt:Uri><tt:InvalidAfterConnect>false</tt:InvalidAfterConnect>"
+                "<tt:InvalidAfterReboot>false</tt:InvalidAfterReboot><tt:Timeout>PT0S</tt:Timeout>"
+                "</trt:MediaUri></trt:GetSnapshotUriResponse>"
+            )
+        if op in ("ContinuousMove", "AbsoluteMove", "RelativeMove", "Stop"):
+            return envelope(f"<tptz:{op}Response/>")
+        return None
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.server.offline:
+            # Simulated reboot / Wi-Fi drop: hang up without answering.
+            self.close_connection = True
+            return
+        match = OP_RE.search(body)
+        op = match.group(1).decode() if match else "?"
+        self.server.count(op)
+        delay = self.server.latency + random.uniform(-self.server.jitter, self.server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        reply = self.reply_for(op)
+        code = 200 if reply is not None else 500
+        if reply is None:
+            reply = fault(f"Mock does not implement {op}")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/soap+xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def do_GET(self):
+        if self.path != "/snapshot.jpg":
+            self.send_error(404)
+            return
+        # Smallest valid JPEG-ish payload; enough for snapshot plumbing tests.
+        data = b"\xff\xd8\xff\xd9"
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class MockOnvifServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=8899, latency_ms=0.0, jitter_ms=0.0,
+                 clock_skew=0.0, verbose=False):
+        super().__init__((host, port), MockOnvifHandler)
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.clock_skew = clock_skew
+        self.verbose = verbose
+        self.offline = False
+        self.counts = {}
+        self.counts_lock = threading.Lock()
+
+    def count(self, op):
+        with self.counts_lock:
+            self.counts[op] = self.counts.get(op, 0) + 1
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="mock-onvif", daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock ONVIF device (Device, Media, PTZ)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--clock-skew", type=float, default=0.0, help="seconds added to the reported camera time")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    server = MockOnvifServer(args.host, args.port, args.latency_ms, args.jitter_ms,
+                             args.clock_skew, args.verbose)
+    print(f"Mock ONVIF device on http://{args.host}:{args.port}/onvif/device_service", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Requests served: {server.counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# CamCommander benchmark suite.
+#
+# Runs the real CamCommanderCore against local stand-ins so results are
+# comparable between releases and machines:
+#   - bench/mock_onvif.py as the camera (configurable latency/jitter),
+#   - an ffmpeg testsrc2 stream published to a local mediamtx RTSP server
+#     as the video source (recording is skipped if mediamtx is missing),
+#   - a generated recordings directory with --clips fake clips.
+# Measures connect time, PTZ latency/throughput, recordings summary scan
+# time and recorder CPU, and writes everything to a JSON file.
+#
+#   python3 bench/run_bench.py --latency-ms 20 --jitter-ms 10 --out bench-v10.json
+#   python3 bench/run_bench.py --skip-recording --compare bench-v10.json
+
+import argparse
+import contextlib
+import datetime
+import importlib.util
+import io
+import json
+import os
+import platform
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(os.path.dirname(HERE), "NVR_PTZ_ONVIR_All_In_One_Cam_Commander_Tkinker_GUI-V10.py")
+sys.path.insert(0, HERE)
+from mock_onvif import MockOnvifServer  # noqa: E402
+
+
+def load_app(home):
+    # The app resolves ~/.ptz_*.json at import time, so HOME must be set first.
+    os.environ["HOME"] = home
+    spec = importlib.util.spec_from_file_location("camcommander", SCRIPT)
+    app = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(app)
+    return app
+
+
+@contextlib.contextmanager
+def quiet(enabled=True):
+    # The app is chatty ([DEBUG] on every call); keep the bench output readable.
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def latency_stats(samples):
+    ms = sorted(s * 1000 for s in samples)
+    if not ms:
+        return {}
+
+    def pct(p):
+        return round(ms[min(len(ms) - 1, int(round(p / 100.0 * (len(ms) - 1))))], 3)
+
+    return {"n": len(ms), "mean_ms": round(statistics.mean(ms), 3), "p50_ms": pct(50),
+            "p95_ms": pct(95), "p99_ms": pct(99), "max_ms": round(ms[-1], 3)}
+
+
+def bench_connect(core, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        if not core.connect_camera():
+            raise RuntimeError(f"connect to mock failed: {core.last_error}")
+        samples.append(time.perf_counter() - start)
+    return {"cold_ms": round(samples[0] * 1000, 3), "warm": latency_stats(samples[1:])}
+
+
+def bench_ptz(core, commands, threads, duration):
+    samples = []
+    for i in range(commands):
+        start = time.perf_counter()
+        if not core.move(1 if i % 2 else -1, 0):
+            raise RuntimeError(f"ContinuousMove failed: {core.last_error}")
+        samples.append(time.perf_counter() - start)
+    sequential = latency_stats(samples)
+    sequential["ops_per_s"] = round(len(samples) / sum(samples), 1)
+
+    # Concurrent callers (e.g. several API clients) share one ONVIF session.
+    done = []
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        count = 0
+        while time.perf_counter() < deadline:
+            core.move(0.5, 0.5)
+            count += 1
+        done.append(count)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return {"sequential": sequential,
+            "concurrent": {"threads": threads, "ops": sum(done), "ops_per_s": round(sum(done) / elapsed, 1)}}
+
+
+def make_fake_recordings(path, clips, days=90):
+    marker = os.path.join(path, ".bench-clips")
+    if os.path.exists(marker):
+        with open(marker) as f:
+            if f.read().strip() == str(clips):
+                return False
+        shutil.rmtree(path)
+    os.makedirs(path, exist_ok=True)
+    now = time.time()
+    step = days * 86400.0 / clips
+    for i in range(clips):
+        mtime = now - (clips - i) * step
+        stamp = datetime.datetime.fromtimestamp(mtime).strftime("%Y%m%d%H%M%S")
+        clip = os.path.join(path, f"{i:06d}-{stamp}.mkv")
+        with open(clip, "wb") as f:
+            f.truncate(1024 * 1024 * (1 + i % 20))  # sparse: sizes look real, disk stays empty
+        os.utime(clip, (mtime, mtime))
+    with open(marker, "w") as f:
+        f.write(str(clips))
+    return True
+
+
+def bench_summary_scan(core, path, clips, runs):
+    start = time.perf_counter()
+    created = make_fake_recordings(path, clips)
+    setup_s = time.perf_counter() - start
+    # The clip index lives in the (reused) clips folder: drop it so every run
+    # measures the same cold build, then time the warm no-change syncs.
+    for suffix in ("", "-wal", "-shm"):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(path, ".ccgui-index.sqlite" + suffix))
+    core.save_dir = path
+    core._clip_index = None
+    start = time.perf_counter()
+    core.recordings_summary()
+    cold_s = time.perf_counter() - start
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        summary = core.recordings_summary()
+        samples.append(time.perf_counter() - start)
+    return {"clips": clips, "generated": created, "setup_s": round(setup_s, 2),
+            "cold_build_ms": round(cold_s * 1000, 1), "warm_sync": latency_stats(samples), "summary": summary}
+
+
+RTSP_SERVERS = ("mediamtx", "rtsp-simple-server")
+
+
+def rtsp_server_binary():
+    return next((name for name in RTSP_SERVERS if shutil.which(name)), None)
+
+
+def wait_for_port(port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def start_rtsp_source(workdir, port, size, fps):
+    # ffmpeg's RTSP muxer can only publish to a server, so run mediamtx as
+    # the "camera" and push testsrc2 into it; the recorder then pulls from
+    # mediamtx like it would from a real camera.
+    path = "Streaming/Channels/101"
+    url = f"rtsp://127.0.0.1:{port}/{path}"
+    conf = os.path.join(workdir, "mediamtx.yml")
+    with open(conf, "w") as f:
+        f.write(f"logLevel: warn\nrtspAddress: 127.0.0.1:{port}\npaths:\n  {path}:\n")
+    server = subprocess.Popen([rtsp_server_binary(), conf])
+    procs = [server]
+    try:
+        if not wait_for_port(port, 10):
+            raise RuntimeError(f"RTSP server did not listen on :{port}")
+        procs.append(subprocess.Popen([
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-re",
+            "-f", "lavfi", "-i", f"testsrc2=size={size}:rate={fps}",
+            "-c:v", "libx264", "-preset", "ultrafast", "-tune", "zerolatency", "-g", str(fps * 2),
+            "-f", "rtsp", "-rtsp_transport", "tcp", url
+        ]))
+        time.sleep(2.0)  # let the publisher connect and send a keyframe
+        if procs[1].poll() is not None:
+            raise RuntimeError(f"ffmpeg publisher exited with {procs[1].returncode}")
+    except Exception:
+        stop_procs(procs)
+        raise
+    return procs, url
+
+
+def stop_procs(procs):
+    for proc in reversed(procs):
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def recorded_bytes(rec_dir):
+    total = 0
+    for name in os.listdir(rec_dir):
+        if name.lower().endswith((".mkv", ".mp4", ".avi")):
+            total += os.path.getsize(os.path.join(rec_dir, name))
+    return total
+
+
+def bench_recording(app, url, workdir, seconds):
+    rec_dir = os.path.join(workdir, "rec")
+    os.makedirs(rec_dir, exist_ok=True)
+    if shutil.which("motion"):
+        conf = os.path.join(workdir, "motion.conf")
+        with open(conf, "w") as f:
+            f.write(f"daemon off\nnetcam_url {url}\ntarget_dir {rec_dir}\n"
+                    "movie_output on\nemulate_motion on\npicture_output off\n"
+                    "webcontrol_port 0\nstream_port 0\nlog_level 4\n")
+        recorder, cmd = "motion", ["motion", "-n", "-c", conf]
+    else:
+        recorder, cmd = "ffmpeg-copy", [
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-rtsp_transport", "tcp", "-i", url,
+            "-c", "copy", "-f", "segment", "-segment_time", "60", os.path.join(rec_dir, "rec-%03d.mkv")
+        ]
+    proc = subprocess.Popen(cmd)
+    try:
+        time.sleep(1.0)
+        first = app.proc_stats(proc.pid)
+        if first is None:
+            return {"recorder": recorder, "skipped": "recorder exited or /proc unavailable"}
+        peak_rss = first[0]
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            time.sleep(0.5)
+            stats = app.proc_stats(proc.pid)
+            if stats is None:
+                return {"recorder": recorder, "skipped": "recorder exited early"}
+            peak_rss = max(peak_rss, stats[0])
+        elapsed = time.perf_counter() - start
+        cpu = stats[1] - first[1]
+        # A recorder stuck reconnecting also burns CPU; only report it if frames landed on disk.
+        written = recorded_bytes(rec_dir)
+        if not written:
+            return {"recorder": recorder, "skipped": "recorder wrote no video (no frames received)"}
+        return {"recorder": recorder, "seconds": round(elapsed, 1), "recorded_mb": round(written / 2**20, 1),
+                "cpu_percent": round(100.0 * cpu / elapsed, 1), "peak_rss_mb": round(peak_rss / 2**20, 1)}
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "-C", os.path.dirname(SCRIPT), "describe", "--always", "--dirty"],
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+
+KEY_RESULTS = (
+    ("connect.cold_ms", ("connect", "cold_ms")),
+    ("connect.warm.p50_ms", ("connect", "warm", "p50_ms")),
+    ("ptz.sequential.p50_ms", ("ptz", "sequential", "p50_ms")),
+    ("ptz.sequential.p99_ms", ("ptz", "sequential", "p99_ms")),
+    ("ptz.concurrent.ops_per_s", ("ptz", "concurrent", "ops_per_s")),
+    ("summary_scan.cold_build_ms", ("summary_scan", "cold_build_ms")),
+    ("summary_scan.warm_sync.p50_ms", ("summary_scan", "warm_sync", "p50_ms")),
+    ("recording.cpu_percent", ("recording", "cpu_percent")),
+)
+
+
+def dig(data, keys):
+    for key in keys:
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
+
+
+def print_comparison(old, new):
+    print(f"\nCompared with {old.get('meta', {}).get('revision')}:")
+    for label, keys in KEY_RESULTS:
+        before, after = dig(old, keys), dig(new, keys)
+        if before is None or after is None:
+            continue
+        change = f"{100.0 * (after - before) / before:+.1f}%" if before else "n/a"
+        print(f"  {label:<28} {before:>10} -> {after:<10} ({change})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CamCommander benchmark suite")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="mock camera reply latency")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="mock camera latency jitter (+/-)")
+    parser.add_argument("--connect-runs", type=int, default=5)
+    parser.add_argument("--ptz-commands", type=int, default=200)
+    parser.add_argument("--ptz-threads", type=int, default=4)
+    parser.add_argument("--ptz-seconds", type=float, default=5.0)
+    parser.add_argument("--clips", type=int, default=100000)
+    parser.add_argument("--scan-runs", type=int, default=3)
+    parser.add_argument("--clips-dir", help="where to keep the fake recordings (reused between runs)")
+    parser.add_argument("--record-seconds", type=float, default=20.0)
+    parser.add_argument("--rtsp-port", type=int, default=8554)
+    parser.add_argument("--video-size", default="1280x720")
+    parser.add_argument("--fps", type=int, default=15)
+    parser.add_argument("--skip-recording", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="show the app's [DEBUG] output")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", metavar="OLD.json", help="print deltas against an earlier result file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="ccgui-bench-")
+    clips_dir = args.clips_dir or os.path.join(tempfile.gettempdir(), f"ccgui-bench-clips-{args.clips}")
+    mock = MockOnvifServer("127.0.0.1", 0, args.latency_ms, args.jitter_ms).start()
+    mock_port = mock.server_address[1]
+    results = {"meta": {
+        "revision": git_revision(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "mock_latency_ms": args.latency_ms,
+        "mock_jitter_ms": args.jitter_ms,
+    }}
+    try:
+        with open(os.path.join(workdir, ".ptz_config.json"), "w") as f:
+            json.dump({"port": mock_port}, f)
+        with quiet(not args.verbose):
+            app = load_app(workdir)
+            core = app.CamCommanderCore("127.0.0.1", "admin", "admin")
+
+        print(f"connect: {args.connect_runs} runs against mock on :{mock_port}")
+        with quiet(not args.verbose):
+            results["connect"] = bench_connect(core, args.connect_runs)
+        print(f"  {results['connect']}")
+
+        print(f"ptz: {args.ptz_commands} sequential moves, {args.ptz_threads} threads for {args.ptz_seconds}s")
+        with quiet(not args.verbose):
+            results["ptz"] = bench_ptz(core, args.ptz_commands, args.ptz_threads, args.ptz_seconds)
+        print(f"  {results['ptz']}")
+
+        print(f"summary scan: {args.clips} clips in {clips_dir}")
+        with quiet(not args.verbose):
+            results["summary_scan"] = bench_summary_scan(core, clips_dir, args.clips, args.scan_runs)
+        print(f"  cold build {results['summary_scan']['cold_build_ms']} ms, warm sync {results['summary_scan']['warm_sync']}")
+
+        if args.skip_recording:
+            results["recording"] = {"skipped": "--skip-recording"}
+        elif not shutil.which("ffmpeg"):
+            results["recording"] = {"skipped": "ffmpeg not installed"}
+        elif not rtsp_server_binary():
+            results["recording"] = {"skipped": "no RTSP server (install mediamtx)"}
+        else:
+            print(f"recording: {args.video_size}@{args.fps} synthetic RTSP for {args.record_seconds}s")
+            try:
+                source, url = start_rtsp_source(workdir, args.rtsp_port, args.video_size, args.fps)
+            except RuntimeError as e:
+                results["recording"] = {"skipped": str(e)}
+            else:
+                try:
+                    results["recording"] = bench_recording(app, url, workdir, args.record_seconds)
+                finally:
+                    stop_procs(source)
+        print(f"  {results['recording']}")
+
+        results["mock_requests"] = dict(mock.counts)
+        results["metrics"] = app.METRICS.as_dict()
+    finally:
+        mock.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.out}")
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
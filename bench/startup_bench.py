@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# Startup regression benchmark for CamCommander.
+#
+# Launches the app N times with --profile-startup --quit-after-startup, parses
+# the "[PROFILE] JSON {...}" line and fails (exit 1) if the median total launch
+# time is over the target. Needs a reachable camera (or bench/mock_onvif.py) and,
+# for GUI runs, a display.
+#
+#   python3 bench/startup_bench.py 192.168.1.xx --runs 5 --target-ms 4000
+#   python3 bench/startup_bench.py 192.168.1.xx --headless --target-ms 2500
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SCRIPT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "NVR_PTZ_ONVIR_All_In_One_Cam_Commander_Tkinker_GUI-V10.py"
+)
+
+
+def run_once(ip, headless, timeout):
+    cmd = [sys.executable, SCRIPT, ip, "--profile-startup", "--quit-after-startup"]
+    if headless:
+        # Bind the API to an ephemeral port so runs don't collide with a live daemon.
+        cmd += ["--headless", "--api", "127.0.0.1:0"]
+    out = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    for line in out.stdout.splitlines():
+        if line.startswith("[PROFILE] JSON "):
+            return json.loads(line[len("[PROFILE] JSON "):])
+    raise RuntimeError(f"no startup profile in output (exit {out.returncode}):\n{out.stdout}\n{out.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CamCommander startup regression benchmark")
+    parser.add_argument("ip", help="camera (or mock server) IP")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=4000.0,
+                        help="fail if the median total startup exceeds this (default 4000, a Pi 3B budget)")
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", metavar="PATH", help="also write the results to PATH")
+    args = parser.parse_args()
+
+    runs = []
+    for i in range(args.runs):
+        timings = run_once(args.ip, args.headless, args.timeout)
+        print(f"run {i + 1}: " + ", ".join(f"{k}={v:.0f}ms" for k, v in timings.items()))
+        runs.append(timings)
+
+    phases = sorted({name for run in runs for name in run})
+    median = {name: statistics.median(run.get(name, 0.0) for run in runs) for name in phases}
+    print("median: " + ", ".join(f"{k}={v:.0f}ms" for k, v in median.items()))
+
+    passed = median["total"] <= args.target_ms
+    result = {"runs": runs, "median": median, "target_ms": args.target_ms, "passed": passed}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    if not passed:
+        print(f"FAIL: median startup {median['total']:.0f} ms > target {args.target_ms:.0f} ms")
+        sys.exit(1)
+    print(f"OK: median startup {median['total']:.0f} ms <= target {args.target_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()